@@ -1,7 +1,14 @@
 """Authentication API routes"""
+import uuid
+from typing import Optional
 from fastapi import APIRouter, HTTPException, status, Depends
-from core.schemas import LoginRequest, TokenResponse, RegisterRequest, UserResponse
-from core.auth import create_access_token, get_current_user, get_password_hash
+from fastapi.security import HTTPAuthorizationCredentials
+from core.schemas import LoginRequest, TokenResponse, RegisterRequest, UserResponse, RefreshRequest, LogoutRequest
+from core.auth import (
+    create_access_token, create_refresh_token, get_current_user, get_password_hash, token_claims,
+    decode_token, revoke_user_tokens, revoked_tokens, security,
+)
+from core.permissions import is_admin
 from models.models import User, Role
 
 router = APIRouter()
@@ -37,19 +44,89 @@ def login(credentials: LoginRequest):
             detail="User account is inactive"
         )
     
-    # Create JWT token
-    access_token = create_access_token(data={"user_id": user.id, "email": user.email})
+    # Create JWT tokens
+    access_token = create_access_token(data=token_claims(user))
+    refresh_token = create_refresh_token(user)
     
     # Convert user to response model
     user_response = UserResponse.model_validate(user)
     
     return TokenResponse(
         access_token=access_token,
+        refresh_token=refresh_token,
         token_type="bearer",
         user=user_response
     )
 
 
+@router.post("/refresh", response_model=TokenResponse)
+def refresh(data: RefreshRequest):
+    """
+    Exchange a refresh token for a new access/refresh token pair
+    Refresh tokens are single use: each call revokes the one presented. A token
+    replayed once within REFRESH_REUSE_GRACE_SECONDS of its rotation (another
+    tab refreshing at the same time) still gets a pair while the token that
+    replaced it is live; any other replay ends every session of the user
+    """
+    payload = decode_token(data.refresh_token, "refresh")
+    
+    try:
+        user = User.objects.select_related('role').get(id=payload.get("user_id"))
+    except User.DoesNotExist:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User account is inactive"
+        )
+    
+    revoked = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Refresh token has been revoked",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    if payload.get("ver", 0) != user.token_version:
+        raise revoked
+    new_jti = uuid.uuid4().hex
+    if (
+        not revoked_tokens.revoke(payload, replaced_by=new_jti)
+        and not revoked_tokens.claim_reuse_grace(payload.get("jti"))
+    ):
+        # A spent refresh token replayed outside its grace means it leaked; end every session
+        revoke_user_tokens(user)
+        raise revoked
+    
+    return TokenResponse(
+        access_token=create_access_token(data=token_claims(user)),
+        refresh_token=create_refresh_token(user, jti=new_jti),
+        token_type="bearer",
+        user=UserResponse.model_validate(user)
+    )
+
+
+@router.post("/logout")
+def logout(
+    data: Optional[LogoutRequest] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Revoke the current access token and, if given, the refresh token
+    """
+    revoked_tokens.revoke(decode_token(credentials.credentials, "access"))
+    if data and data.refresh_token:
+        payload = decode_token(data.refresh_token, "refresh")
+        if payload.get("user_id") == current_user.id:
+            revoked_tokens.revoke(payload)
+    
+    return {"message": "Logged out successfully"}
+
+
 @router.post("/register", response_model=UserResponse)
 def register(
     user_data: RegisterRequest,
@@ -59,7 +136,7 @@ def register(
     Register a new user (Admin only)
     """
     # Check if current user is Admin
-    if not current_user.is_admin():
+    if not is_admin(current_user):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only admins can create new users"
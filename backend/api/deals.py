@@ -1,21 +1,132 @@
 """Deal management API routes"""
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List
-from core.schemas import DealResponse, DealCreate, DealUpdate, DealStageUpdate, ActivityResponse
+from fastapi import APIRouter, HTTPException, status, Depends, Header
+from contextlib import nullcontext
+from decimal import Decimal
+from typing import List, Optional, Union
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from core.schemas import (
+    DealResponse, DealCreate, DealUpdate, DealStageUpdate, ActivityResponse,
+    DealSummary, ActivitySummary, ActivityRollupResponse, CompactListResponse,
+)
+from core.serialization import list_response, compact_response
+from core.db_router import replica_read
+from core.jobs import log_activity
+from core import inbox
+from core.archive import with_archived
+from core.loader import loader_for
+from core.workflow import get_workflow
+from core.cache import cached_response, response_cache, deal_tag, DEALS_TAG, USERS_TAG
 from core.auth import get_current_user
-from core.permissions import is_analyst_or_above, can_edit_deal
-from models.models import User, Deal, Activity
+from core.permissions import is_admin, is_analyst_or_above, can_edit_deal
+from models.models import User, Deal, Activity, ActivityRollup
 
 router = APIRouter()
 
 
-@router.get("", response_model=List[DealResponse])
-def list_deals(current_user: User = Depends(get_current_user)):
+def _check_size(value):
+    """Round to the column's scale so responses match what is stored"""
+    if value is None:
+        return None
+    places = Deal._meta.get_field('check_size').decimal_places
+    return value.quantize(Decimal(1).scaleb(-places))
+
+
+def _expected_version(if_match: Optional[str], body_version: Optional[int]) -> Optional[int]:
+    """Deal version the client's edit is based on: If-Match ("3" or W/"3") or the body's `version`"""
+    if if_match is None or if_match.strip() == "*":
+        return body_version
+    try:
+        return int(if_match.strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="If-Match must be a deal version"
+        )
+
+
+def _conflict(deal: Deal) -> HTTPException:
+    """409 carrying the deal's current state so the client can reconcile without a re-fetch"""
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={
+            "message": "Deal was modified by someone else",
+            "current": DealResponse.model_validate(deal).model_dump(mode="json"),
+        }
+    )
+
+
+def _parse_ids(ids: str) -> List[int]:
+    """Comma-separated deal ids, de-duplicated in the order given"""
+    try:
+        parsed = list(dict.fromkeys(int(part) for part in ids.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be comma-separated deal ids"
+        )
+    if len(parsed) > settings.DEALS_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.DEALS_BATCH_MAX_IDS} ids per request"
+        )
+    return parsed
+
+
+def _update_deal_fields(deal: Deal, **fields):
+    """
+    UPDATE ... WHERE id = ? AND version = <version we loaded>, bumping the version.
+    No affected row means someone else wrote in between: 409 with their state.
+    """
+    now = timezone.now()
+    updated = Deal.objects.filter(id=deal.id, version=deal.version).update(
+        **fields, version=F('version') + 1, updated_at=now
+    )
+    if not updated:
+        current = Deal.objects.select_related('owner', 'owner__role').filter(id=deal.id).first()
+        if current is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Deal not found"
+            )
+        raise _conflict(current)
+    for field, value in fields.items():
+        setattr(deal, field, value)
+    deal.version += 1
+    deal.updated_at = now
+
+
+@router.get("", response_model=Union[List[DealResponse], CompactListResponse])
+@cached_response(tags=lambda **_: [DEALS_TAG, USERS_TAG])
+@replica_read
+def list_deals(
+    ids: Optional[str] = None,
+    compact: bool = False,
+    include_archived: bool = False,
+    current_user: User = Depends(get_current_user)
+):
     """
     List all deals (accessible to all authenticated users)
+    With ?ids=1,2,3 only those deals, in that order (unknown ids are left out),
+    fetched with one query
+    With ?compact=true owners are referenced by id and listed once in `users`
+    Archived deals are only found with ?include_archived=true
     """
-    deals = Deal.objects.select_related('owner', 'owner__role').filter(status='active').all()
-    return [DealResponse.model_validate(deal) for deal in deals]
+    if ids is not None:
+        deals = [
+            deal for deal in loader_for("deal").get_many(_parse_ids(ids))
+            if include_archived or deal.status == 'active'
+        ]
+        if compact:
+            return compact_response(deals, DealSummary, 'owner_id')
+        return list_response(DealResponse, deals)
+    
+    deals = Deal.readable(include_archived).all()
+    if compact:
+        return compact_response(deals, DealSummary, 'owner_id')
+    return list_response(DealResponse, deals.select_related('owner', 'owner__role'))
 
 
 @router.post("", response_model=DealResponse)
@@ -38,33 +149,32 @@ def create_deal(
         company_url=deal_data.company_url,
         owner=current_user,
         round=deal_data.round,
-        check_size=deal_data.check_size,
+        check_size=_check_size(deal_data.check_size),
         stage='Sourced'
     )
     
     # Log activity
-    Activity.objects.create(
-        deal=deal,
-        user=current_user,
-        action=f"created deal '{deal.name}'"
-    )
-    
-    # Reload to get related objects
-    deal = Deal.objects.select_related('owner', 'owner__role').get(id=deal.id)
+    log_activity(deal.id, current_user.id, f"created deal '{deal.name}'", follow=inbox.OWNER)
+    response_cache.invalidate(DEALS_TAG)
     
+    # deal.owner is current_user (with its role), so no reload is needed
     return DealResponse.model_validate(deal)
 
 
 @router.get("/{deal_id}", response_model=DealResponse)
+@cached_response(tags=lambda deal_id, **_: [deal_tag(deal_id), USERS_TAG])
+@replica_read
 def get_deal(
     deal_id: int,
+    include_archived: bool = False,
     current_user: User = Depends(get_current_user)
 ):
     """
     Get a specific deal by ID
+    Archived deals are only found with ?include_archived=true
     """
     try:
-        deal = Deal.objects.select_related('owner', 'owner__role').get(id=deal_id)
+        deal = Deal.readable(include_archived).select_related('owner', 'owner__role').get(id=deal_id)
     except Deal.DoesNotExist:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -78,13 +188,16 @@ def get_deal(
 def update_deal(
     deal_id: int,
     deal_data: DealUpdate,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user)
 ):
     """
     Update a deal (owner or Admin only)
+    Send the deal's `version` as If-Match (or in the body) to get a 409 instead
+    of overwriting someone else's edit
     """
     try:
-        deal = Deal.objects.select_related('owner').get(id=deal_id)
+        deal = Deal.objects.select_related('owner', 'owner__role').get(id=deal_id)
     except Deal.DoesNotExist:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -98,33 +211,26 @@ def update_deal(
             detail="You don't have permission to edit this deal"
         )
     
-    # Update fields
-    updated_fields = []
-    if deal_data.name is not None:
-        deal.name = deal_data.name
-        updated_fields.append("name")
-    if deal_data.company_url is not None:
-        deal.company_url = deal_data.company_url
-        updated_fields.append("company_url")
-    if deal_data.round is not None:
-        deal.round = deal_data.round
-        updated_fields.append("round")
-    if deal_data.check_size is not None:
-        deal.check_size = deal_data.check_size
-        updated_fields.append("check_size")
-    
-    deal.save()
-    
-    # Log activity if fields were updated
-    if updated_fields:
-        Activity.objects.create(
-            deal=deal,
-            user=current_user,
-            action=f"updated {', '.join(updated_fields)}"
-        )
+    expected = _expected_version(if_match, deal_data.version)
+    if expected is not None and expected != deal.version:
+        raise _conflict(deal)
+    
+    # Update only the fields whose value actually changes
+    changes = {
+        "name": deal_data.name,
+        "company_url": deal_data.company_url,
+        "round": deal_data.round,
+        "check_size": _check_size(deal_data.check_size),
+    }
+    updated_fields = [
+        field for field, value in changes.items()
+        if value is not None and getattr(deal, field) != value
+    ]
     
-    # Reload to get related objects
-    deal = Deal.objects.select_related('owner', 'owner__role').get(id=deal.id)
+    if updated_fields:
+        _update_deal_fields(deal, **{field: changes[field] for field in updated_fields})
+        log_activity(deal.id, current_user.id, f"updated {', '.join(updated_fields)}")
+        response_cache.invalidate(deal_tag(deal.id), DEALS_TAG)
     
     return DealResponse.model_validate(deal)
 
@@ -133,43 +239,68 @@ def update_deal(
 def update_deal_stage(
     deal_id: int,
     stage_data: DealStageUpdate,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user)
 ):
     """
     Move a deal to a different stage (creates activity log)
+    Only moves allowed by DEAL_WORKFLOW whose guards pass are accepted (400 otherwise)
+    Send the deal's `version` as If-Match (or in the body) to get a 409 instead
+    of overwriting someone else's move
     """
+    workflow = get_workflow()
+    if stage_data.stage not in workflow.stages:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid stage. Must be one of: {', '.join(workflow.stages)}"
+        )
+    
+    # The target stage's guards are evaluated by the query that loads the deal
     try:
-        deal = Deal.objects.select_related('owner').get(id=deal_id)
+        deal = (
+            Deal.objects.select_related('owner', 'owner__role')
+            .annotate(**workflow.annotations(stage_data.stage))
+            .get(id=deal_id)
+        )
     except Deal.DoesNotExist:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Deal not found"
         )
     
-    # Validate stage
-    valid_stages = ['Sourced', 'Screen', 'Diligence', 'IC', 'Invested', 'Passed']
-    if stage_data.stage not in valid_stages:
+    expected = _expected_version(if_match, stage_data.version)
+    if expected is not None and expected != deal.version:
+        raise _conflict(deal)
+    
+    # Moving to the current stage is a no-op
+    if deal.stage == stage_data.stage:
+        return DealResponse.model_validate(deal)
+    
+    if not workflow.allowed(deal.stage, stage_data.stage):
+        allowed = sorted(workflow.next[deal.stage])
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Can't move a deal from {deal.stage} to {stage_data.stage}. "
+                   f"Allowed: {', '.join(allowed) or 'none'}"
+        )
+    failed = workflow.failed_guard(deal, stage_data.stage)
+    if failed:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid stage. Must be one of: {', '.join(valid_stages)}"
+            detail=failed
         )
     
     # Store old stage for activity log
     old_stage = deal.stage
     
-    # Update stage
-    deal.stage = stage_data.stage
-    deal.save()
+    # Update stage; with hooks, in one transaction so a failing hook undoes the move
+    with transaction.atomic() if workflow.hooks.get(stage_data.stage) else nullcontext():
+        _update_deal_fields(deal, stage=stage_data.stage)
+        workflow.run_hooks(deal, old_stage, current_user)
     
     # Log activity
-    Activity.objects.create(
-        deal=deal,
-        user=current_user,
-        action=f"moved '{deal.name}' from {old_stage} to {stage_data.stage}"
-    )
-    
-    # Reload to get related objects
-    deal = Deal.objects.select_related('owner', 'owner__role').get(id=deal.id)
+    log_activity(deal.id, current_user.id, f"moved '{deal.name}' from {old_stage} to {stage_data.stage}")
+    response_cache.invalidate(deal_tag(deal.id), DEALS_TAG)
     
     return DealResponse.model_validate(deal)
 
@@ -182,7 +313,7 @@ def archive_deal(
     """
     Archive a deal (Admin only)
     """
-    if not current_user.is_admin():
+    if not is_admin(current_user):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only admins can archive deals"
@@ -198,34 +329,60 @@ def archive_deal(
     
     # Archive instead of delete
     deal.status = 'archived'
-    deal.save()
+    deal.version = F('version') + 1
+    deal.save(update_fields=["status", "version", "updated_at"])
     
     # Log activity
-    Activity.objects.create(
-        deal=deal,
-        user=current_user,
-        action=f"archived deal '{deal.name}'"
-    )
+    log_activity(deal.id, current_user.id, f"archived deal '{deal.name}'")
+    response_cache.invalidate(deal_tag(deal.id), DEALS_TAG)
     
     return {"message": "Deal archived successfully"}
 
 
-@router.get("/{deal_id}/activities", response_model=List[ActivityResponse])
+@router.get("/{deal_id}/activities", response_model=Union[List[ActivityResponse], CompactListResponse])
+@replica_read
 def get_deal_activities(
     deal_id: int,
+    compact: bool = False,
+    include_archived: bool = False,
     current_user: User = Depends(get_current_user)
 ):
     """
     Get activity log for a specific deal
+    With ?compact=true users are referenced by id and listed once in `users`
+    Archived deals are only found with ?include_archived=true
     """
     try:
-        deal = Deal.objects.get(id=deal_id)
+        deal = Deal.readable(include_archived).get(id=deal_id)
     except Deal.DoesNotExist:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Deal not found"
         )
     
-    activities = Activity.objects.select_related('user', 'user__role').filter(deal=deal).all()
-    return [ActivityResponse.model_validate(activity) for activity in activities]
+    activities = Activity.objects.filter(deal=deal)
+    if compact:
+        return compact_response(with_archived(deal, activities, '-created_at'), ActivitySummary, 'user_id')
+    activities = activities.select_related('user', 'user__role')
+    return list_response(ActivityResponse, with_archived(deal, activities, '-created_at', 'user'))
 
+
+@router.get("/{deal_id}/activities/daily", response_model=List[ActivityRollupResponse])
+@replica_read
+def get_deal_activity_rollups(
+    deal_id: int,
+    include_archived: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get the daily activity summaries that compact_history left in place of
+    entries past their retention period
+    Archived deals are only found with ?include_archived=true
+    """
+    if not Deal.readable(include_archived).filter(id=deal_id).exists():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deal not found"
+        )
+    
+    return list_response(ActivityRollupResponse, ActivityRollup.objects.filter(deal_id=deal_id))
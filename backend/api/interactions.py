@@ -1,33 +1,53 @@
 """Comments and Votes API routes"""
 from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List
-from core.schemas import CommentResponse, CommentCreate, VoteResponse, VoteCreate
+from typing import List, Union
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from core.schemas import (
+    CommentResponse, CommentCreate, VoteResponse, VoteCreate,
+    CommentSummary, VoteSummary, CompactListResponse, DecisionResponse,
+)
+from core.serialization import list_response, compact_response
+from core.db_router import replica_read
+from core import inbox
+from core.archive import with_archived
+from core.cache import cached_response, response_cache, deal_tag, USERS_TAG
 from core.auth import get_current_user
 from core.permissions import can_vote
-from models.models import User, Deal, Comment, Vote
+from core.decisions import record_vote, weight_for
+from models.models import User, Deal, Comment, Vote, DealDecision
 
 router = APIRouter()
 
 
 # Comment endpoints
-@router.get("/{deal_id}/comments", response_model=List[CommentResponse])
+@router.get("/{deal_id}/comments", response_model=Union[List[CommentResponse], CompactListResponse])
+@cached_response(tags=lambda deal_id, **_: [deal_tag(deal_id), USERS_TAG])
+@replica_read
 def list_comments(
     deal_id: int,
+    compact: bool = False,
+    include_archived: bool = False,
     current_user: User = Depends(get_current_user)
 ):
     """
     List all comments for a deal
+    With ?compact=true users are referenced by id and listed once in `users`
+    Archived deals are only found with ?include_archived=true
     """
     try:
-        deal = Deal.objects.get(id=deal_id)
+        deal = Deal.readable(include_archived).get(id=deal_id)
     except Deal.DoesNotExist:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Deal not found"
         )
     
-    comments = Comment.objects.select_related('user', 'user__role').filter(deal=deal).order_by('-created_at').all()
-    return [CommentResponse.model_validate(comment) for comment in comments]
+    comments = Comment.objects.filter(deal=deal).order_by('-created_at')
+    if compact:
+        return compact_response(with_archived(deal, comments, '-created_at'), CommentSummary, 'user_id')
+    comments = comments.select_related('user', 'user__role')
+    return list_response(CommentResponse, with_archived(deal, comments, '-created_at', 'user'))
 
 
 @router.post("/{deal_id}/comments", response_model=CommentResponse)
@@ -53,32 +73,41 @@ def create_comment(
         user=current_user,
         content=comment_data.content
     )
+    response_cache.invalidate(deal_tag(deal.id))
+    inbox.deal_event(deal.id, current_user.id, follow=inbox.COMMENT)
     
-    # Reload to get related objects
-    comment = Comment.objects.select_related('user', 'user__role').get(id=comment.id)
-    
+    # comment.user is current_user (with its role), so no reload is needed
     return CommentResponse.model_validate(comment)
 
 
 # Vote endpoints
-@router.get("/{deal_id}/votes", response_model=List[VoteResponse])
+@router.get("/{deal_id}/votes", response_model=Union[List[VoteResponse], CompactListResponse])
+@cached_response(tags=lambda deal_id, **_: [deal_tag(deal_id), USERS_TAG])
+@replica_read
 def list_votes(
     deal_id: int,
+    compact: bool = False,
+    include_archived: bool = False,
     current_user: User = Depends(get_current_user)
 ):
     """
     List all votes for a deal
+    With ?compact=true users are referenced by id and listed once in `users`
+    Archived deals are only found with ?include_archived=true
     """
     try:
-        deal = Deal.objects.get(id=deal_id)
+        deal = Deal.readable(include_archived).get(id=deal_id)
     except Deal.DoesNotExist:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Deal not found"
         )
     
-    votes = Vote.objects.select_related('user', 'user__role').filter(deal=deal).order_by('-created_at').all()
-    return [VoteResponse.model_validate(vote) for vote in votes]
+    votes = Vote.objects.filter(deal=deal).order_by('-created_at')
+    if compact:
+        return compact_response(with_archived(deal, votes, '-created_at'), VoteSummary, 'user_id')
+    votes = votes.select_related('user', 'user__role')
+    return list_response(VoteResponse, with_archived(deal, votes, '-created_at', 'user'))
 
 
 @router.post("/{deal_id}/vote", response_model=VoteResponse)
@@ -96,14 +125,6 @@ def cast_vote(
             detail="Only Partners and Admins can vote"
         )
     
-    try:
-        deal = Deal.objects.get(id=deal_id)
-    except Deal.DoesNotExist:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Deal not found"
-        )
-    
     # Validate vote value
     if vote_data.vote not in ['approve', 'decline']:
         raise HTTPException(
@@ -111,55 +132,88 @@ def cast_vote(
             detail="Vote must be either 'approve' or 'decline'"
         )
     
-    # Check if user has already voted
-    existing_vote = Vote.objects.filter(deal=deal, user=current_user).first()
-    
-    if existing_vote:
-        # Update existing vote
-        existing_vote.vote = vote_data.vote
-        existing_vote.comment = vote_data.comment
-        existing_vote.save()
-        vote = existing_vote
-    else:
-        # Create new vote
-        vote = Vote.objects.create(
-            deal=deal,
-            user=current_user,
-            vote=vote_data.vote,
-            comment=vote_data.comment
-        )
-    
-    # Reload to get related objects
-    vote = Vote.objects.select_related('user', 'user__role').get(id=vote.id)
+    # Insert or replace the user's vote in one statement; a missing deal fails the FK.
+    # The deal's decision counters are adjusted by what changed in the same transaction,
+    # so they never drift from the votes (this may auto-advance the deal).
+    with transaction.atomic():
+        try:
+            vote = Vote.upsert(
+                deal_id, current_user.id, vote_data.vote, vote_data.comment, weight=weight_for(current_user)
+            )
+        except IntegrityError:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Deal not found"
+            )
+        record_vote(vote, current_user)
+    vote.user = current_user  # already loaded, with its role
+    response_cache.invalidate(deal_tag(deal_id))
+    inbox.deal_event(deal_id, current_user.id, follow=inbox.VOTE)
     
     return VoteResponse.model_validate(vote)
 
 
+def _decision(deal: Deal) -> DealDecision:
+    """The deal's decision counters (loaded with select_related('decision')); zeros before any vote"""
+    return getattr(deal, 'decision', None) or DealDecision(deal=deal)
+
+
 @router.get("/{deal_id}/vote/summary")
+@replica_read
 def get_vote_summary(
     deal_id: int,
+    include_archived: bool = False,
     current_user: User = Depends(get_current_user)
 ):
     """
     Get vote summary for a deal
+    Archived deals are only found with ?include_archived=true
     """
     try:
-        deal = Deal.objects.get(id=deal_id)
+        deal = Deal.readable(include_archived).select_related('decision').get(id=deal_id)
     except Deal.DoesNotExist:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Deal not found"
         )
     
-    votes = Vote.objects.filter(deal=deal)
-    
-    approve_count = votes.filter(vote='approve').count()
-    decline_count = votes.filter(vote='decline').count()
-    total_votes = votes.count()
-    
+    # Running counters kept by cast_vote (core.decisions)
+    decision = _decision(deal)
     return {
-        "total_votes": total_votes,
-        "approve": approve_count,
-        "decline": decline_count
+        "total_votes": decision.approve_count + decision.decline_count,
+        "approve": decision.approve_count,
+        "decline": decision.decline_count
     }
 
+
+@router.get("/{deal_id}/decision", response_model=DecisionResponse)
+@replica_read
+def get_decision(
+    deal_id: int,
+    include_archived: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get the IC decision for a deal: vote counters and the outcome under IC_DECISION
+    Archived deals are only found with ?include_archived=true
+    """
+    try:
+        deal = Deal.readable(include_archived).select_related('decision').get(id=deal_id)
+    except Deal.DoesNotExist:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deal not found"
+        )
+    
+    decision = _decision(deal)
+    return DecisionResponse(
+        deal_id=deal.id,
+        outcome=decision.outcome,
+        approve_count=decision.approve_count,
+        decline_count=decision.decline_count,
+        approve_weight=decision.approve_weight,
+        decline_weight=decision.decline_weight,
+        quorum=settings.IC_DECISION['quorum'],
+        approve_threshold=settings.IC_DECISION['approve_threshold'],
+        decided_at=decision.decided_at,
+    )
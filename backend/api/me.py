@@ -0,0 +1,40 @@
+"""Current user's own views: the deal inbox"""
+from fastapi import APIRouter, HTTPException, status, Depends
+from core.schemas import InboxItem, InboxResponse
+from core.auth import get_current_user
+from core.inbox import mark_seen
+from models.models import User, InboxEntry
+
+router = APIRouter()
+
+
+@router.get("/inbox", response_model=InboxResponse)
+def get_inbox(current_user: User = Depends(get_current_user)):
+    """
+    Deals the current user owns, commented or voted on, most recently changed
+    first, with the number of changes by others since they last looked
+    """
+    entries = (
+        InboxEntry.objects.filter(user=current_user, deal__status='active')
+        .select_related('deal')
+        .order_by('-last_activity_at')
+    )
+    items = [InboxItem.model_validate(entry, from_attributes=True) for entry in entries]
+    return InboxResponse(unread_total=sum(item.unread_count for item in items), items=items)
+
+
+@router.post("/inbox/{deal_id}/seen")
+def mark_inbox_seen(
+    deal_id: int,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Mark everything on a deal as read for the current user
+    """
+    if not mark_seen(current_user.id, deal_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deal is not in your inbox"
+        )
+    
+    return {"message": "Marked as seen"}
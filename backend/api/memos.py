@@ -1,32 +1,65 @@
 """IC Memo API routes with versioning"""
 from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List
-from core.schemas import ICMemoResponse, ICMemoCreate
+from typing import List, Union
+from django.db import IntegrityError
+from django.db.models import Max
+from core.schemas import ICMemoResponse, ICMemoCreate, ICMemoSummary, CompactListResponse
+from core.serialization import list_response, compact_response
+from core.db_router import replica_read
+from core.archive import archived, with_archived
+from core.jobs import log_activity
+from core.cache import cached_response, response_cache, deal_tag, USERS_TAG
 from core.auth import get_current_user
 from core.permissions import is_analyst_or_above
-from models.models import User, Deal, ICMemo, Activity
+from models.models import User, Deal, ICMemo
 
 router = APIRouter()
 
 
-@router.get("/{deal_id}/memos", response_model=List[ICMemoResponse])
+def _latest_memo(deal: Deal):
+    memos = ICMemo.objects.select_related('created_by', 'created_by__role').filter(deal=deal).order_by('-version')
+    return next(iter(with_archived(deal, memos[:1], '-version', 'created_by')), None)
+
+
+def _conflict(deal: Deal) -> HTTPException:
+    """409 carrying the latest memo so the editor can reconcile without a re-fetch"""
+    latest = _latest_memo(deal)
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={
+            "message": "A newer memo version was saved by someone else",
+            "current": ICMemoResponse.model_validate(latest).model_dump(mode="json") if latest else None,
+        }
+    )
+
+
+@router.get("/{deal_id}/memos", response_model=Union[List[ICMemoResponse], CompactListResponse])
+@cached_response(tags=lambda deal_id, **_: [deal_tag(deal_id), USERS_TAG])
+@replica_read
 def list_memo_versions(
     deal_id: int,
+    compact: bool = False,
+    include_archived: bool = False,
     current_user: User = Depends(get_current_user)
 ):
     """
     List all IC Memo versions for a deal
+    With ?compact=true users are referenced by id and listed once in `users`
+    Archived deals are only found with ?include_archived=true
     """
     try:
-        deal = Deal.objects.get(id=deal_id)
+        deal = Deal.readable(include_archived).get(id=deal_id)
     except Deal.DoesNotExist:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Deal not found"
         )
     
-    memos = ICMemo.objects.select_related('created_by', 'created_by__role').filter(deal=deal).order_by('-version').all()
-    return [ICMemoResponse.model_validate(memo) for memo in memos]
+    memos = ICMemo.objects.filter(deal=deal).order_by('-version')
+    if compact:
+        return compact_response(with_archived(deal, memos, '-version'), ICMemoSummary, 'created_by_id')
+    memos = memos.select_related('created_by', 'created_by__role')
+    return list_response(ICMemoResponse, with_archived(deal, memos, '-version', 'created_by'))
 
 
 @router.post("/{deal_id}/memos", response_model=ICMemoResponse)
@@ -38,6 +71,8 @@ def create_memo_version(
     """
     Create a new IC Memo version (Analyst and Admin only)
     Each save creates a new version with full snapshot
+    With `base_version` set, a save based on an outdated version gets a 409
+    carrying the latest memo instead of silently replacing it
     """
     if not is_analyst_or_above(current_user):
         raise HTTPException(
@@ -45,85 +80,100 @@ def create_memo_version(
             detail="Only Analysts and Admins can create/edit memos"
         )
     
-    try:
-        deal = Deal.objects.get(id=deal_id)
-    except Deal.DoesNotExist:
+    # The deal and its latest memo version in one query
+    deal = Deal.objects.filter(id=deal_id).annotate(last_version=Max('ic_memos__version')).first()
+    if deal is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Deal not found"
         )
     
-    # Create new memo version (version auto-increments in save method)
-    memo = ICMemo.objects.create(
+    latest_version = deal.last_version or 0
+    if deal.in_cold_storage:
+        # Number new versions after the archived ones too
+        latest_version = max([latest_version] + [memo.version for memo in archived(deal.id, 'memo')])
+    if memo_data.base_version is not None and memo_data.base_version != latest_version:
+        raise _conflict(deal)
+    
+    # Create new memo version; unique (deal, version) makes the insert conditional
+    memo = ICMemo(
         deal=deal,
+        version=latest_version + 1,
         sections=memo_data.sections.model_dump(),
+        is_milestone=memo_data.is_milestone,
         created_by=current_user
     )
+    try:
+        memo.save(assign_version=False)
+    except IntegrityError:
+        # Another save took this version number between our read and insert
+        raise _conflict(deal)
     
     # Log activity
-    Activity.objects.create(
-        deal=deal,
-        user=current_user,
-        action=f"saved IC Memo version {memo.version}"
-    )
-    
-    # Reload to get related objects
-    memo = ICMemo.objects.select_related('created_by', 'created_by__role').get(id=memo.id)
+    log_activity(deal.id, current_user.id, f"saved IC Memo version {memo.version}")
+    response_cache.invalidate(deal_tag(deal.id))
     
+    # memo.created_by is current_user (with its role), so no reload is needed
     return ICMemoResponse.model_validate(memo)
 
 
-@router.get("/{deal_id}/memos/{version}", response_model=ICMemoResponse)
-def get_memo_version(
+# Declared before /{version}, which would otherwise capture "latest"
+@router.get("/{deal_id}/memos/latest", response_model=ICMemoResponse)
+@replica_read
+def get_latest_memo(
     deal_id: int,
-    version: int,
+    include_archived: bool = False,
     current_user: User = Depends(get_current_user)
 ):
     """
-    Get a specific IC Memo version
+    Get the latest IC Memo version for a deal
+    Archived deals are only found with ?include_archived=true
     """
     try:
-        deal = Deal.objects.get(id=deal_id)
+        deal = Deal.readable(include_archived).get(id=deal_id)
     except Deal.DoesNotExist:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Deal not found"
         )
     
-    try:
-        memo = ICMemo.objects.select_related('created_by', 'created_by__role').get(deal=deal, version=version)
-    except ICMemo.DoesNotExist:
+    memo = _latest_memo(deal)
+    
+    if not memo:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Memo version {version} not found"
+            detail="No memos found for this deal"
         )
     
     return ICMemoResponse.model_validate(memo)
 
 
-@router.get("/{deal_id}/memos/latest", response_model=ICMemoResponse)
-def get_latest_memo(
+@router.get("/{deal_id}/memos/{version}", response_model=ICMemoResponse)
+@replica_read
+def get_memo_version(
     deal_id: int,
+    version: int,
+    include_archived: bool = False,
     current_user: User = Depends(get_current_user)
 ):
     """
-    Get the latest IC Memo version for a deal
+    Get a specific IC Memo version
+    Archived deals are only found with ?include_archived=true
     """
     try:
-        deal = Deal.objects.get(id=deal_id)
+        deal = Deal.readable(include_archived).get(id=deal_id)
     except Deal.DoesNotExist:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Deal not found"
         )
     
-    memo = ICMemo.objects.select_related('created_by', 'created_by__role').filter(deal=deal).order_by('-version').first()
-    
-    if not memo:
+    memos = ICMemo.objects.select_related('created_by', 'created_by__role').filter(deal=deal, version=version)
+    memo = next(iter(with_archived(deal, memos, '-version', 'created_by', version=version)), None)
+    if memo is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="No memos found for this deal"
+            detail=f"Memo version {version} not found"
         )
     
     return ICMemoResponse.model_validate(memo)
-
@@ -1,8 +1,12 @@
 """User management API routes (Admin only)"""
 from fastapi import APIRouter, HTTPException, status, Depends
 from typing import List
+from django.conf import settings
 from core.schemas import UserResponse, UserCreate, UserUpdate
-from core.auth import get_current_user
+from core.serialization import list_response
+from core.cache import response_cache, USERS_TAG
+from core.auth import get_current_user, revoke_user_tokens
+from core.permissions import is_admin
 from models.models import User, Role
 
 router = APIRouter()
@@ -13,14 +17,14 @@ def list_users(current_user: User = Depends(get_current_user)):
     """
     List all users (Admin only)
     """
-    if not current_user.is_admin():
+    if not is_admin(current_user):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only admins can list users"
         )
     
     users = User.objects.select_related('role').all()
-    return [UserResponse.model_validate(user) for user in users]
+    return list_response(UserResponse, users)
 
 
 @router.post("", response_model=UserResponse)
@@ -31,7 +35,7 @@ def create_user(
     """
     Create a new user (Admin only)
     """
-    if not current_user.is_admin():
+    if not is_admin(current_user):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only admins can create users"
@@ -85,7 +89,7 @@ def update_user(
     """
     Update a user (Admin only)
     """
-    if not current_user.is_admin():
+    if not is_admin(current_user):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only admins can update users"
@@ -100,6 +104,7 @@ def update_user(
         )
     
     # Update fields
+    role_changed = False
     if user_data.first_name is not None:
         user.first_name = user_data.first_name
     if user_data.last_name is not None:
@@ -107,6 +112,7 @@ def update_user(
     if user_data.role_id is not None:
         try:
             role = Role.objects.get(id=user_data.role_id)
+            role_changed = role.id != user.role_id
             user.role = role
         except Role.DoesNotExist:
             raise HTTPException(
@@ -116,6 +122,13 @@ def update_user(
     
     user.save()
     
+    # Stateless tokens embed the old role; make the user log in again.
+    # Other tokens load the role per request, so the change applies at once.
+    if role_changed and settings.JWT_STATELESS_AUTH:
+        revoke_user_tokens(user)
+    # Deal, comment, vote and memo responses embed user names and roles
+    response_cache.invalidate(USERS_TAG)
+    
     return UserResponse.model_validate(user)
 
 
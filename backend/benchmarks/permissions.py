@@ -0,0 +1,57 @@
+"""
+Permission check microbenchmark: the previous per-call checks (role name
+string comparisons and `in` over the Role.permissions JSON list) vs. the
+compiled registry in core.permissions.
+
+Usage (from backend/, against a seeded database):
+    python benchmarks/permissions.py [iterations]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings_api')
+
+import django  # noqa: E402
+
+django.setup()
+
+from core.permissions import check_permission, is_analyst_or_above, can_vote, permission_registry  # noqa: E402
+from models.models import User  # noqa: E402
+
+
+def previous_checks(user):
+    """The checks as they were implemented before the registry"""
+    return (
+        bool(user.role and 'manage_users' in user.role.permissions),
+        bool(user.role and user.role.name in ['Admin', 'Analyst']),
+        bool(user.role and user.role.name in ['Admin', 'Partner']),
+    )
+
+
+def registry_checks(user):
+    return (
+        check_permission(user, 'manage_users'),
+        is_analyst_or_above(user),
+        can_vote(user),
+    )
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    users = list(User.objects.select_related('role').filter(role__isnull=False))
+    if not users:
+        sys.exit("No users with roles; run seed_data.py first")
+    permission_registry.role(users[0].role_id)  # compile once up front
+
+    for user in users:
+        assert previous_checks(user) == registry_checks(user), user.email
+
+    for label, func in [('previous', previous_checks), ('registry', registry_checks)]:
+        seconds = timeit.timeit(lambda: [func(user) for user in users], number=iterations // len(users))
+        print(f"{label:10} {seconds / iterations * 1e9:8.0f} ns per user (3 checks)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Serialization benchmark for a 10k-deal list response.
+
+Compares the previous path (model_validate per row, FastAPI re-validation,
+jsonable_encoder + stdlib json) with the single-validation orjson fast path
+and the compact owner-by-id form. Rows are built in memory, so no database
+is needed.
+
+Usage (from backend/):
+    python benchmarks/serialization.py [deals]
+"""
+import json
+import os
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings_api')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.utils import timezone  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from core.schemas import DealResponse, DealSummary, UserSummary  # noqa: E402
+from core.serialization import FastJSONResponse, list_adapter, list_response  # noqa: E402
+from models.models import Deal, Role, User  # noqa: E402
+
+PERMISSIONS = ['view_deals', 'create_deals', 'edit_any_deal', 'delete_deals',
+               'create_memos', 'edit_memos', 'comment', 'vote', 'manage_users']
+
+
+def build_deals(count: int, owners: int = 25):
+    now = timezone.now()
+    roles = [Role(id=i, name=name, hierarchy_level=i, permissions=PERMISSIONS)
+             for i, name in enumerate(['Partner', 'Analyst', 'Admin'], start=1)]
+    users = [User(id=i, email=f"user{i}@dealflow.com", username=f"user{i}", first_name="First",
+                  last_name="Last", role=roles[i % 3], created_at=now) for i in range(owners)]
+    return [Deal(id=i, name=f"Deal {i}", company_url="https://example.com", owner=users[i % owners],
+                 stage='Diligence', round='Series A', check_size=Decimal('2500000.00'),
+                 status='active', created_at=now, updated_at=now) for i in range(count)]
+
+
+def previous_path(deals) -> bytes:
+    """Handler model_validate + FastAPI response_model validation + stdlib json"""
+    validated = [DealResponse.model_validate(deal) for deal in deals]
+    revalidated = list_adapter(DealResponse).validate_python([item.model_dump() for item in validated])
+    return json.dumps(jsonable_encoder(revalidated)).encode()
+
+
+def fast_path(deals) -> bytes:
+    return list_response(DealResponse, deals).body
+
+
+def compact_path(deals) -> bytes:
+    """What compact_response() encodes, minus the .values() query"""
+    rows = [{name: getattr(deal, name) for name in DealSummary.model_fields} for deal in deals]
+    owners = {deal.owner_id: deal.owner for deal in deals}
+    users = [{'id': user.id, 'email': user.email, 'username': user.username,
+              'first_name': user.first_name, 'last_name': user.last_name, 'role_name': user.role.name}
+             for user in owners.values()]
+    assert set(users[0]) == set(UserSummary.model_fields)
+    return FastJSONResponse({'items': rows, 'users': users}).body
+
+
+def best_of(func, deals, runs=3):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        body = func(deals)
+        timings.append(time.perf_counter() - start)
+    return min(timings), len(body)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    deals = build_deals(count)
+    print(f"{count} deals:")
+    baseline = None
+    for label, func in [('previous', previous_path), ('orjson fast path', fast_path),
+                        ('compact (owner ids)', compact_path)]:
+        seconds, size = best_of(func, deals)
+        baseline = baseline or (seconds, size)
+        print(f"  {label:20} {seconds * 1000:8.1f} ms  {size / 1024:8.0f} KiB   "
+              f"({baseline[0] / seconds:4.1f}x faster, {size / baseline[1]:4.0%} of payload)")
+
+
+if __name__ == '__main__':
+    main()
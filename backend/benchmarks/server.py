@@ -0,0 +1,94 @@
+"""
+Server configuration benchmark: the current single-process
+`uvicorn main:app` setup vs. the tuned `serve.py` launcher.
+
+Each configuration is started on its own port against the configured
+database (seed it first with seed_data.py), then hammered with concurrent
+authenticated GET /api/deals requests.
+
+Usage (from backend/):
+    python benchmarks/server.py [requests] [concurrency]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+CONFIGS = {
+    'uvicorn main:app (current)': [sys.executable, '-m', 'uvicorn', 'main:app', '--port', '{port}'],
+    'serve.py (tuned)': [sys.executable, 'serve.py', '--port', '{port}'],
+}
+
+
+def wait_until_ready(base_url: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/health/ready") as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{base_url} did not become ready")
+
+
+def login(base_url: str) -> str:
+    body = json.dumps({'email': 'admin@dealflow.com', 'password': 'admin123'}).encode()
+    request = urllib.request.Request(
+        f"{base_url}/api/auth/login", data=body, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)['access_token']
+
+
+def run_load(base_url: str, token: str, total: int, concurrency: int):
+    request = urllib.request.Request(f"{base_url}/api/deals", headers={'Authorization': f"Bearer {token}"})
+
+    def one(_):
+        start = time.perf_counter()
+        with urllib.request.urlopen(request) as response:
+            response.read()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        latencies = sorted(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+    return {
+        'rps': total / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+
+    for port, (label, command) in enumerate(CONFIGS.items(), start=7101):
+        base_url = f"http://127.0.0.1:{port}"
+        process = subprocess.Popen(
+            [part.format(port=port) for part in command], cwd=BACKEND_DIR,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=os.environ.copy(),
+        )
+        try:
+            wait_until_ready(base_url)
+            token = login(base_url)
+            run_load(base_url, token, min(total, 200), concurrency)  # warm every worker
+            result = run_load(base_url, token, total, concurrency)
+        finally:
+            process.terminate()
+            process.wait()
+        print(f"{label:28} {result['rps']:8.0f} req/s   p50 {result['p50_ms']:6.1f} ms   "
+              f"p99 {result['p99_ms']:6.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Cold start benchmark: time to import the API (django.setup + routers) under
+the full Django settings vs. the API-only profile.
+
+Usage (from backend/):
+    python benchmarks/startup.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+PROFILES = {
+    'full (core.settings)': 'core.settings',
+    'api-only (core.settings_api)': 'core.settings_api',
+}
+
+
+def time_import(settings_module: str) -> float:
+    """Wall-clock seconds for a fresh interpreter to import main"""
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings_module}
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'import main'], cwd=BACKEND_DIR, env=env, check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    results = {}
+    for label, module in PROFILES.items():
+        time_import(module)  # warm the OS file cache / bytecode
+        results[label] = [time_import(module) for _ in range(runs)]
+
+    print(f"Cold start over {runs} runs:")
+    for label, timings in results.items():
+        print(f"  {label:32} median {statistics.median(timings) * 1000:7.1f} ms   "
+              f"min {min(timings) * 1000:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
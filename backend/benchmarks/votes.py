@@ -0,0 +1,125 @@
+"""
+IC voting burst: the previous read-then-write vote path vs. Vote.upsert.
+
+1. Concurrency: several threads cast the same user's vote on the same deal
+   at once. The previous path can lose the race on unique (deal, user) and
+   fail with IntegrityError; the upsert must never fail and must leave
+   exactly one row.
+2. Throughput: every partner votes on every deal from a thread pool, as
+   when a deal enters IC.
+
+Runs against a throwaway SQLite database.
+
+Usage (from backend/):
+    python benchmarks/votes.py [partners] [deals] [threads]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings_api')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+settings.DATABASES['default']['NAME'] = os.path.join(tempfile.mkdtemp(), 'votes.sqlite3')
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import IntegrityError, connection  # noqa: E402
+
+from models.models import Deal, Role, User, Vote  # noqa: E402
+
+
+def previous_cast_vote(deal_id, user, vote, comment=None):
+    """The vote path as it was: read the deal, look for a vote, then update or insert, then reload"""
+    deal = Deal.objects.get(id=deal_id)
+    existing_vote = Vote.objects.filter(deal=deal, user=user).first()
+    if existing_vote:
+        existing_vote.vote = vote
+        existing_vote.comment = comment
+        existing_vote.save()
+        result = existing_vote
+    else:
+        result = Vote.objects.create(deal=deal, user=user, vote=vote, comment=comment)
+    return Vote.objects.select_related('user', 'user__role').get(id=result.id)
+
+
+def upsert_cast_vote(deal_id, user, vote, comment=None):
+    return Vote.upsert(deal_id, user.id, vote, comment)
+
+
+def in_thread(func):
+    """Run func in a pool thread and close that thread's connection afterwards"""
+    def run(*args):
+        try:
+            return func(*args)
+        finally:
+            connection.close()
+    return run
+
+
+def race(cast, deal, user, threads: int) -> int:
+    """Cast the same user's vote from `threads` threads at once; returns failures"""
+    barrier = threading.Barrier(threads)
+    failures = 0
+
+    def vote(index):
+        nonlocal failures
+        barrier.wait()
+        try:
+            cast(deal.id, user, 'approve' if index % 2 else 'decline')
+        except IntegrityError:
+            failures += 1
+
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(in_thread(vote), range(threads)))
+    return failures
+
+
+def burst(cast, deals, partners, threads: int) -> float:
+    """Every partner votes on every deal; returns votes per second"""
+    jobs = [(deal.id, user) for deal in deals for user in partners]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(in_thread(lambda job: cast(job[0], job[1], 'approve')), jobs))
+    return len(jobs) / (time.perf_counter() - start)
+
+
+def main():
+    partners_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    deals_count = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    threads = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    call_command('migrate', verbosity=0)
+    role = Role.objects.create(name='Partner', hierarchy_level=1, permissions=['vote'])
+    partners = [
+        User.objects.create(username=f'p{i}', email=f'p{i}@example.com', role=role)
+        for i in range(partners_count)
+    ]
+
+    print(f"Race: {threads} threads cast one partner's vote on one deal (20 rounds)")
+    for label, cast in [('previous', previous_cast_vote), ('upsert', upsert_cast_vote)]:
+        failures = 0
+        for _ in range(20):
+            deal = Deal.objects.create(name='Race', owner=partners[0])
+            failures += race(cast, deal, partners[0], threads)
+            assert Vote.objects.filter(deal=deal).count() == 1
+        print(f"  {label:10} {failures} IntegrityErrors")
+        if label == 'upsert':
+            assert failures == 0
+
+    print(f"Burst: {partners_count} partners x {deals_count} deals, {threads} threads")
+    for label, cast in [('previous', previous_cast_vote), ('upsert', upsert_cast_vote)]:
+        deals = [Deal.objects.create(name=f'IC {i}', owner=partners[0]) for i in range(deals_count)]
+        first = burst(cast, deals, partners, threads)
+        again = burst(cast, deals, partners, threads)  # every vote now exists: update path
+        print(f"  {label:10} {first:8.0f} new votes/s   {again:8.0f} changed votes/s")
+
+
+if __name__ == '__main__':
+    main()
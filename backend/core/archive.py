@@ -0,0 +1,164 @@
+"""
+Cold storage for archived deals.
+
+Archiving a deal only flips its status. `manage.py archive_deals` later moves
+the activities, comments, votes and memo versions of deals archived more than
+ARCHIVE_AFTER_DAYS ago out of their hot tables into ArchivedRecord (which may
+live in its own database), ARCHIVE_BATCH_SIZE rows at a time. Each batch is
+copied first, then its deals are flagged in_cold_storage, then the hot rows
+are deleted, so a reader always finds every row on one side or the other.
+
+A batch that stops part-way is safe to rerun: the copy overwrites matching
+archived rows, and the hot rows are only flagged and deleted (together, in
+one transaction) once every copied row is confirmed in ArchivedRecord.
+
+Readers of a deal's child rows go through with_archived(): for a deal in cold
+storage it merges the hot rows (anything written since, or not yet deleted)
+with the archived ones. Rows are matched on their key within the deal (the
+id; the voter for votes; the version for memos) and the hot copy wins, so a
+vote re-cast on a cold deal replaces the archived one.
+"""
+from datetime import timedelta
+from operator import attrgetter
+from typing import Dict, List, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.db import router, transaction
+from django.utils import timezone
+
+# kind -> (model name, field identifying a row within its deal)
+KINDS = {
+    "activity": ("Activity", "id"),
+    "comment": ("Comment", "id"),
+    "vote": ("Vote", "user_id"),
+    "memo": ("ICMemo", "version"),
+}
+
+
+def _model(kind: str):
+    return apps.get_model("models", KINDS[kind][0])
+
+
+def kind_of(model) -> str:
+    return next(kind for kind, (name, _) in KINDS.items() if name == model.__name__)
+
+
+def _instance(model, data: dict):
+    """Rebuild a model instance from an archived row's values"""
+    obj = model(**{
+        field.attname: field.to_python(data[field.attname])
+        for field in model._meta.concrete_fields
+        if field.attname in data
+    })
+    obj._state.adding = False
+    return obj
+
+
+def archive_batch(kind: str, cutoff, batch_size: int) -> int:
+    """Move up to batch_size rows of `kind` whose deal was archived before cutoff; returns rows moved"""
+    from models.models import ArchivedRecord, Deal
+
+    model = _model(kind)
+    key_field = KINDS[kind][1]
+    rows = list(
+        model.objects.filter(deal__status="archived", deal__updated_at__lt=cutoff)
+        .order_by("id")
+        .values()[:batch_size]
+    )
+    if not rows:
+        return 0
+
+    now = timezone.now()
+    keys = {(row["deal_id"], str(row[key_field])) for row in rows}
+    deal_ids = {deal_id for deal_id, _ in keys}
+    # A row written after its deal went cold replaces the archived row with the same key
+    ArchivedRecord.objects.bulk_create(
+        [
+            ArchivedRecord(deal_id=row["deal_id"], kind=kind, key=str(row[key_field]), data=row, archived_at=now)
+            for row in rows
+        ],
+        update_conflicts=True,
+        unique_fields=["deal_id", "kind", "key"],
+        update_fields=["data", "archived_at"],
+    )
+    copied = set(
+        ArchivedRecord.objects.filter(kind=kind, deal_id__in=deal_ids, key__in={key for _, key in keys})
+        .values_list("deal_id", "key")
+    )
+    if not keys <= copied:
+        raise RuntimeError(f"Archiving {kind} rows: {len(keys - copied)} copies missing from ArchivedRecord")
+
+    with transaction.atomic(using=router.db_for_write(model)):
+        Deal.objects.filter(id__in=deal_ids, in_cold_storage=False).update(in_cold_storage=True)
+        model.objects.filter(id__in=[row["id"] for row in rows]).delete()
+    return len(rows)
+
+
+def archive_deals(days: Optional[int] = None, batch_size: Optional[int] = None) -> Dict[str, int]:
+    """Move every eligible child row to cold storage; returns rows moved per kind"""
+    days = settings.ARCHIVE_AFTER_DAYS if days is None else days
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    cutoff = timezone.now() - timedelta(days=days)
+    moved = {}
+    for kind in KINDS:
+        moved[kind] = 0
+        while True:
+            count = archive_batch(kind, cutoff, batch_size)
+            if not count:
+                break
+            moved[kind] += count
+    return moved
+
+
+def archived(deal_id: int, kind: str, key=None) -> List:
+    """The deal's archived rows of `kind` (only the one with `key`, if given) as model instances"""
+    from models.models import ArchivedRecord
+
+    model = _model(kind)
+    records = ArchivedRecord.objects.filter(deal_id=deal_id, kind=kind)
+    if key is not None:
+        records = records.filter(key=str(key))
+    return [_instance(model, data) for data in records.values_list("data", flat=True)]
+
+
+def archived_row(deal_id: int, kind: str, key):
+    """The deal's archived row of `kind` with the given key as a model instance, or None"""
+    return next(iter(archived(deal_id, kind, key)), None)
+
+
+def with_archived(deal, queryset, order_by: str, user_field: Optional[str] = None, **match):
+    """
+    The child rows of `deal` selected by `queryset` plus its archived rows of
+    the same kind, ordered by `order_by` ('-field' for descending). Unless the
+    deal is in cold storage the queryset is returned as is.
+
+    Archived rows are filtered on `match` (field=value) and get `user_field`
+    attached with its role, mirroring the queryset's filter and select_related.
+    Archived rows of deleted users are dropped, as the cascade would have.
+    """
+    if not deal.in_cold_storage:
+        return queryset
+
+    kind = kind_of(queryset.model)
+    key_field = KINDS[kind][1]
+    key = attrgetter(key_field)
+    hot = list(queryset)
+    hot_keys = {key(obj) for obj in hot}
+    # Matching on the row key narrows the archive query to that one row
+    cold = [
+        obj for obj in archived(deal.id, kind, match.get(key_field))
+        if key(obj) not in hot_keys and all(getattr(obj, name) == value for name, value in match.items())
+    ]
+
+    if user_field and cold:
+        from core.loader import loader_for
+
+        user_id = attrgetter(f"{user_field}_id")
+        users = loader_for("user").want(user_id(obj) for obj in cold)
+        cold = [obj for obj in cold if users.get(user_id(obj)) is not None]
+        for obj in cold:
+            setattr(obj, user_field, users.get(user_id(obj)))
+
+    field = order_by.lstrip("-")
+    return sorted(hot + cold, key=attrgetter(field), reverse=order_by.startswith("-"))
@@ -1,6 +1,9 @@
 """JWT authentication utilities"""
-from datetime import datetime, timedelta
-from typing import Optional
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
@@ -33,28 +36,300 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex, "type": "access"})
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
     
     return encoded_jwt
 
 
-def decode_access_token(token: str) -> dict:
-    """Decode and verify a JWT token"""
+def create_refresh_token(user, jti: Optional[str] = None) -> str:
+    """Create a long-lived, single-use refresh token"""
+    expire = datetime.utcnow() + timedelta(days=settings.JWT_REFRESH_TOKEN_EXPIRE_DAYS)
+    to_encode = {
+        "user_id": user.id,
+        "ver": user.token_version,
+        "exp": expire,
+        "jti": jti or uuid.uuid4().hex,
+        "type": "refresh",
+    }
+    return jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+
+
+def token_claims(user) -> dict:
+    """
+    Claims for a user's access token. Every token carries the user's token
+    version; with JWT_STATELESS_AUTH the profile and role are embedded too,
+    so requests can be authenticated without a database query.
+    """
+    claims = {"user_id": user.id, "email": user.email, "ver": user.token_version}
+    if settings.JWT_STATELESS_AUTH:
+        role = user.role
+        claims.update({
+            "username": user.username,
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "created_at": user.created_at.isoformat(),
+            "role": None if role is None else {
+                "id": role.id,
+                "name": role.name,
+                "hierarchy_level": role.hierarchy_level,
+                "permissions": list(role.permissions),
+            },
+        })
+    return claims
+
+
+class TokenVersionCache:
+    """
+    In-process map of user_id -> (token_version, is_active), or None for an
+    id with no user. The whole table is reloaded (one small query) at most
+    every TOKEN_VERSION_CACHE_SECONDS, so a version bump in another worker
+    takes effect within that window; bumps in this worker apply immediately.
+    Ids missing from the last reload are looked up one at a time.
+    """
+
+    def __init__(self):
+        self._versions: Dict[int, Tuple[int, bool]] = {}
+        self._loaded_at = 0.0
+        self._seen_at: Dict[int, float] = {}  # entries confirmed by a later per-user query
+        self._lock = threading.Lock()
+
+    def _reload(self):
+        from models.models import User
+
+        rows = User.objects.values_list('id', 'token_version', 'is_active')
+        self._versions = {user_id: (version, active) for user_id, version, active in rows}
+        self._loaded_at = time.monotonic()
+
+    def get(self, user_id: int) -> Optional[Tuple[int, bool]]:
+        if time.monotonic() - self._loaded_at > settings.TOKEN_VERSION_CACHE_SECONDS:
+            with self._lock:
+                if time.monotonic() - self._loaded_at > settings.TOKEN_VERSION_CACHE_SECONDS:
+                    self._reload()
+        if user_id in self._versions:
+            return self._versions[user_id]
+        # Not in the last reload (created since, or no such user): look up just this one.
+        # Misses are cached as None too, until the next reload.
+        from models.models import User
+
+        entry = User.objects.filter(id=user_id).values_list('token_version', 'is_active').first()
+        self._versions[user_id] = entry
+        return entry
+
+    def peek(self, user_id: int) -> Optional[Tuple[int, bool]]:
+        """
+        Cached entry without ever reloading (safe to call from the event loop).
+        None when the entry is older than TOKEN_VERSION_CACHE_SECONDS.
+        """
+        checked_at = max(self._loaded_at, self._seen_at.get(user_id, 0.0))
+        if time.monotonic() - checked_at > settings.TOKEN_VERSION_CACHE_SECONDS:
+            return None
+        return self._versions.get(user_id)
+
+    def set(self, user_id: int, version: int, is_active: bool):
+        self._versions[user_id] = (version, is_active)
+        self._seen_at[user_id] = time.monotonic()
+
+
+token_versions = TokenVersionCache()
+
+
+def revoke_user_tokens(user) -> None:
+    """Invalidate every token issued to `user` so far (e.g. after a role change)"""
+    from django.db.models import F
+    from models.models import User
+
+    User.objects.filter(id=user.id).update(token_version=F('token_version') + 1)
+    user.refresh_from_db(fields=['token_version'])
+    token_versions.set(user.id, user.token_version, user.is_active)
+
+
+def user_from_claims(payload: dict):
+    """
+    Build an unsaved User (with its Role) from stateless token claims.
+    It has no password or other private fields loaded and must never be saved;
+    it is only good for permission checks, FK assignment and responses.
+    """
+    from models.models import User, Role
+
+    role_claims = payload.get("role")
+    user = User(
+        id=payload["user_id"],
+        email=payload["email"],
+        username=payload["username"],
+        first_name=payload.get("first_name") or "",
+        last_name=payload.get("last_name") or "",
+        created_at=datetime.fromisoformat(payload["created_at"]),
+        token_version=payload.get("ver", 0),
+        is_active=True,
+        role_id=role_claims["id"] if role_claims else None,
+    )
+    if role_claims:
+        user.role = Role(
+            id=role_claims["id"],
+            name=role_claims["name"],
+            hierarchy_level=role_claims["hierarchy_level"],
+            permissions=role_claims["permissions"],
+        )
+    else:
+        user.role = None
+    user._state.adding = False
+    user._state.db = 'default'
+    return user
+
+
+class RevocationList:
+    """
+    In-memory set of revoked token ids backed by the RevokedToken table.
+    Lookups are O(1) set membership. New rows from other workers are pulled
+    incrementally (id > last seen) at most every REVOCATION_SYNC_SECONDS, and
+    expired entries are compacted away every REVOCATION_COMPACT_SECONDS.
+    """
+
+    def __init__(self):
+        self._expiry: Dict[str, datetime] = {}
+        self._last_id = 0
+        self._synced_at = 0.0
+        self._compacted_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _sync(self):
+        from models.models import RevokedToken
+
+        rows = RevokedToken.objects.filter(id__gt=self._last_id).order_by('id').values_list('id', 'jti', 'expires_at')
+        for row_id, jti, expires_at in rows:
+            self._expiry[jti] = expires_at
+            self._last_id = row_id
+        self._synced_at = time.monotonic()
+
+    def _compact(self):
+        from models.models import RevokedToken
+
+        now = datetime.now(timezone.utc)
+        self._expiry = {jti: expires for jti, expires in self._expiry.items() if expires > now}
+        RevokedToken.objects.filter(expires_at__lte=now).delete()
+        self._compacted_at = time.monotonic()
+
+    def _maintain(self):
+        now = time.monotonic()
+        if now - self._synced_at > settings.REVOCATION_SYNC_SECONDS:
+            with self._lock:
+                if now - self._synced_at > settings.REVOCATION_SYNC_SECONDS:
+                    self._sync()
+                if now - self._compacted_at > settings.REVOCATION_COMPACT_SECONDS:
+                    self._compact()
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        if jti is None:
+            return False
+        self._maintain()
+        return jti in self._expiry
+
+    def contains(self, jti: Optional[str]) -> bool:
+        """Membership test without syncing (safe to call from the event loop)"""
+        return jti is not None and jti in self._expiry
+
+    def revoke(self, payload: dict, replaced_by: Optional[str] = None) -> bool:
+        """
+        Revoke a decoded token; False if it was already revoked. `replaced_by`
+        is the jti of the refresh token issued in its place by /refresh.
+        """
+        from django.db import IntegrityError
+        from models.models import RevokedToken
+
+        jti = payload.get("jti")
+        if jti is None:
+            return False
+        expires_at = datetime.fromtimestamp(payload["exp"], tz=timezone.utc)
+        try:
+            RevokedToken.objects.create(
+                jti=jti, user_id=payload["user_id"], expires_at=expires_at, replaced_by=replaced_by
+            )
+        except IntegrityError:
+            self._expiry[jti] = expires_at
+            return False
+        self._expiry[jti] = expires_at
+        return True
+
+    def claim_reuse_grace(self, jti: Optional[str]) -> bool:
+        """
+        Honour one replay of a refresh token /refresh rotated less than
+        REFRESH_REUSE_GRACE_SECONDS ago, as long as its replacement hasn't been
+        revoked (logged out or rotated itself). One conditional UPDATE, so
+        concurrent replays can't both claim it.
+        """
+        from django.db.models import Exists, OuterRef
+        from models.models import RevokedToken
+
+        since = datetime.now(timezone.utc) - timedelta(seconds=settings.REFRESH_REUSE_GRACE_SECONDS)
+        return bool(
+            RevokedToken.objects.filter(
+                jti=jti, replaced_by__isnull=False, grace_used=False, revoked_at__gte=since
+            )
+            .exclude(Exists(RevokedToken.objects.filter(jti=OuterRef('replaced_by'))))
+            .update(grace_used=True)
+        )
+
+
+revoked_tokens = RevocationList()
+
+
+def decode_token(token: str, token_type: str = "access") -> dict:
+    """Decode and verify a JWT of the given type (tokens without a type are access tokens)"""
     try:
         payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-        return payload
     except JWTError:
+        payload = None
+    if payload is None or payload.get("type", "access") != token_type:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return payload
+
+
+def decode_access_token(token: str) -> dict:
+    """Decode and verify a JWT access token, rejecting revoked ones"""
+    payload = decode_token(token, "access")
+    if revoked_tokens.is_revoked(payload.get("jti")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return payload
+
+
+def peek_token(scope, verify_version: bool = True) -> Optional[dict]:
+    """
+    Access token claims for an ASGI scope, or None, for middleware that needs
+    to know who is calling. Everything is checked in memory without touching
+    the database (the ORM can't be used on the event loop): signature, expiry,
+    the revocation list as last synced and, with verify_version, the token
+    version table as last loaded. Users missing from that table yield None.
+    """
+    authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        payload = decode_token(token, "access")
+    except HTTPException:
+        return None
+    if payload.get("user_id") is None or revoked_tokens.contains(payload.get("jti")):
+        return None
+    if verify_version:
+        current = token_versions.peek(payload["user_id"])
+        if current is None or not current[1] or payload.get("ver", 0) != current[0]:
+            return None
+    return payload
 
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """
     Dependency to get the current authenticated user from JWT token
+    Stateless tokens are verified in memory; others load the user from the DB
     """
     from models.models import User
     
@@ -69,8 +344,30 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    if settings.JWT_STATELESS_AUTH and "role" in payload:
+        current = token_versions.get(user_id)
+        if current is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        version, is_active = current
+        if not is_active:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Inactive user"
+            )
+        if payload.get("ver", 0) != version:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has been revoked",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return user_from_claims(payload)
+    
     try:
-        user = User.objects.get(id=user_id)
+        user = User.objects.select_related('role').get(id=user_id)
     except User.DoesNotExist:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -84,6 +381,15 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
             detail="Inactive user"
         )
     
+    if payload.get("ver", 0) != user.token_version:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    # Lets middleware (peek_token) trust this user's tokens for a while
+    token_versions.set(user.id, user.token_version, user.is_active)
     return user
 
 
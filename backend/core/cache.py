@@ -0,0 +1,212 @@
+"""
+Read-through cache of serialized endpoint responses with tag invalidation.
+
+Entries are tagged (e.g. `deal:42`) and every tag has a version number. An
+entry remembers the versions of its tags as they were *before* the endpoint
+ran; invalidating a tag bumps its version, which makes every entry carrying
+the tag stale at once, including one being computed concurrently with the
+write. Tag versions start from a clock reading, so a version that is lost
+(evicted, restarted process) never comes back as an old value.
+
+Backends (RESPONSE_CACHE_BACKEND):
+  MemoryBackend       per-process LRU capped at RESPONSE_CACHE_BYTES
+  DjangoCacheBackend  the Django cache named by RESPONSE_CACHE_ALIAS, e.g. a
+                      file-based cache or a local memcached shared by workers,
+                      capped at that cache's MAX_ENTRIES
+Neither stores an entry bigger than a quarter of RESPONSE_CACHE_BYTES.
+With MemoryBackend an invalidation only reaches the worker that made the
+write; other workers serve their copy for at most RESPONSE_CACHE_TTL seconds.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from fastapi import Response
+from pydantic import BaseModel
+
+from core.db_router import primary_reads
+from core.metrics import registry
+
+USERS_TAG = "users"  # entries embedding user names / roles
+DEALS_TAG = "deals"  # the deal list
+
+
+def deal_tag(deal_id: int) -> str:
+    return f"deal:{deal_id}"
+
+
+def _new_version() -> int:
+    return time.time_ns()
+
+
+class MemoryBackend:
+    """Byte-bounded LRU of entries; tag versions are kept apart and never evicted"""
+
+    def __init__(self):
+        self.max_bytes = settings.RESPONSE_CACHE_BYTES
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: tuple):
+        size = len(entry[-2])
+        if size > self.max_bytes // 4:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[-2])
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted[-2])
+                self.evictions += 1
+
+    def tag_versions(self, tags: Iterable[str]) -> Tuple[int, ...]:
+        with self._lock:
+            return tuple(self._versions.setdefault(tag, _new_version()) for tag in tags)
+
+    def bump(self, tags: Iterable[str]):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = max(self._versions.get(tag, 0) + 1, _new_version())
+
+    def stats(self) -> dict:
+        return {
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+class DjangoCacheBackend:
+    """Entries and tag versions in a Django cache that every worker can reach"""
+
+    def __init__(self):
+        from django.core.cache import caches
+
+        self._cache = caches[settings.RESPONSE_CACHE_ALIAS]
+        self.max_bytes = settings.RESPONSE_CACHE_BYTES
+        self.max_entries = settings.CACHES[settings.RESPONSE_CACHE_ALIAS].get("OPTIONS", {}).get("MAX_ENTRIES")
+
+    def get(self, key: str) -> Optional[tuple]:
+        return self._cache.get(f"response:{key}")
+
+    def set(self, key: str, entry: tuple):
+        if len(entry[-2]) > self.max_bytes // 4:
+            return
+        self._cache.set(f"response:{key}", entry, timeout=settings.RESPONSE_CACHE_TTL)
+
+    def tag_versions(self, tags: Iterable[str]) -> Tuple[int, ...]:
+        keys = [f"tag:{tag}" for tag in tags]
+        found = self._cache.get_many(keys)
+        missing = {key: _new_version() for key in keys if key not in found}
+        for key, version in missing.items():
+            if not self._cache.add(key, version, timeout=None):
+                missing[key] = self._cache.get(key, version)  # another worker won the race
+        found.update(missing)
+        return tuple(found[key] for key in keys)
+
+    def bump(self, tags: Iterable[str]):
+        for tag in tags:
+            self._cache.set(f"tag:{tag}", _new_version(), timeout=None)
+
+    def stats(self) -> dict:
+        # Size and evictions live in the shared cache, out of this worker's sight
+        stats = {"max_bytes": self.max_bytes}
+        if self.max_entries is not None:
+            stats["max_entries"] = self.max_entries
+        return stats
+
+
+class ResponseCache:
+    """Serialized responses (body + ETag) keyed by endpoint and arguments"""
+
+    def __init__(self):
+        self._backend = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = import_string(settings.RESPONSE_CACHE_BACKEND)()
+        return self._backend
+
+    def get_or_compute(self, key: str, tags: List[str], compute: Callable[[], bytes]) -> Tuple[bytes, str]:
+        versions = self.backend.tag_versions(tags)
+        entry = self.backend.get(key)
+        now = time.time()
+        if entry is not None and entry[0] == versions and entry[1] > now:
+            self.hits += 1
+            return entry[2], entry[3]
+        self.misses += 1
+        body = compute()
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        self.backend.set(key, (versions, now + settings.RESPONSE_CACHE_TTL, body, etag))
+        return body, etag
+
+    def invalidate(self, *tags: str):
+        if settings.RESPONSE_CACHE_ENABLED:
+            self.backend.bump(tags)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, **self.backend.stats()}
+
+
+response_cache = ResponseCache()
+registry.register_cache("responses", response_cache.stats)
+
+
+def _render(result) -> bytes:
+    """Bytes FastAPI would have sent for a handler's return value"""
+    if isinstance(result, Response):
+        return result.body
+    if isinstance(result, BaseModel):
+        return result.model_dump_json().encode()
+    raise TypeError(f"Cannot cache a {type(result).__name__} response")
+
+
+def cached_response(tags: Callable[..., List[str]]):
+    """
+    Cache a sync GET handler's serialized response.
+    The key is the handler plus its arguments except `current_user`, so only
+    use it on handlers whose output doesn't depend on who is asking.
+    `tags` gets the same arguments and returns the entry's tags.
+    A miss is computed on the primary even under @replica_read, so a stored
+    entry is never older than the tag versions it is filed under.
+    """
+    def decorator(func: Callable):
+        name = f"{func.__module__}.{func.__name__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not settings.RESPONSE_CACHE_ENABLED:
+                return func(*args, **kwargs)
+            params = {k: v for k, v in kwargs.items() if k != "current_user"}
+            key = name + ":" + ",".join(f"{k}={params[k]}" for k in sorted(params))
+            def compute() -> bytes:
+                with primary_reads():
+                    return _render(func(*args, **kwargs))
+
+            body, etag = response_cache.get_or_compute(key, tags(**params), compute)
+            return Response(body, media_type="application/json", headers={"ETag": etag})
+
+        return wrapper
+    return decorator
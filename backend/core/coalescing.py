@@ -0,0 +1,146 @@
+"""
+Single-flight coalescing of identical concurrent reads.
+
+When several callers ask for the same resource at the same moment (everyone
+opening a deal as it enters IC), only the first request runs the endpoint;
+the others wait for its response and get a copy. Requests are identical when
+they hit the same route with the same path params and query string, fall in
+the same permission scope (see COALESCE_ROUTES) and read from the same
+database: a caller pinned to the primary after a write (core.db_router) never
+shares a replica read.
+
+The shared call runs in its own task, so a disconnecting caller never cancels
+it for the others. Exceptions reach every waiter, and nothing outlives the
+call: the next request after completion runs the endpoint again.
+"""
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from core.auth import peek_token
+from core.db_router import reads_primary
+from core.metrics import registry
+from core.routing import match_route
+
+coalesced_requests_total = registry.counter(
+    "coalesced_requests_total",
+    "Coalescible reads; outcome is leader (ran the endpoint) or follower (shared its response)",
+    ("route", "outcome"),
+)
+
+
+class CapturedResponse:
+    """A complete ASGI response buffered so it can be replayed to every waiter"""
+    __slots__ = ("status", "headers", "body")
+
+    def __init__(self, status: int, headers: List[Tuple[bytes, bytes]], body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    async def replay(self, send):
+        await send({"type": "http.response.start", "status": self.status, "headers": self.headers})
+        await send({"type": "http.response.body", "body": self.body})
+
+
+class SingleFlight:
+    """In-flight calls by key; callers of a key already in flight await its result"""
+
+    def __init__(self):
+        self._calls: Dict[tuple, asyncio.Task] = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: tuple, call) -> Tuple[object, bool]:
+        """Result of `call()` (a coroutine function) and whether it was shared"""
+        task = self._calls.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # shield: cancelling one waiter must not cancel the call for the rest
+        return await asyncio.shield(task), shared
+
+    def _forget(self, key: tuple, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved, even if every waiter went away
+
+
+single_flight = SingleFlight()
+
+
+def coalescing_scope(scope_kind: str, claims: dict) -> Optional[str]:
+    """Who may share a response: everyone authenticated, one role or one user"""
+    if scope_kind == "authenticated":
+        return "authenticated"
+    if scope_kind == "role" and "role" in claims:
+        return f"role:{claims['role']['id']}"
+    return f"user:{claims['user_id']}"
+
+
+class CoalescingMiddleware:
+    """ASGI middleware applying single-flight to the routes in COALESCE_ROUTES"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not settings.COALESCE_ROUTES:
+            await self.app(scope, receive, send)
+            return
+
+        route, path_params = match_route(scope)
+        route_key = f"GET {route.path}" if route is not None else None
+        scope_kind = settings.COALESCE_ROUTES.get(route_key)
+        # Only callers whose token is known good can share someone else's response
+        claims = peek_token(scope) if scope_kind else None
+        if claims is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = (
+            route_key,
+            tuple(sorted(path_params.items())),
+            scope["query_string"],
+            coalescing_scope(scope_kind, claims),
+            reads_primary(claims["user_id"]),
+        )
+
+        async def call() -> CapturedResponse:
+            return await self._capture(scope)
+
+        response, shared = await single_flight.do(key, call)
+        if shared:
+            scope["route"] = route  # so metrics label the follower with the route
+        coalesced_requests_total.inc(route=route.path, outcome="follower" if shared else "leader")
+        await response.replay(send)
+
+    async def _capture(self, scope) -> CapturedResponse:
+        status = 500
+        headers: List[Tuple[bytes, bytes]] = []
+        chunks: List[bytes] = []
+        request_sent = False
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            # Nothing else arrives for a GET; the shared call ignores disconnects
+            await asyncio.Event().wait()
+
+        async def send(message):
+            nonlocal status, headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return CapturedResponse(status, headers, b"".join(chunks))
@@ -0,0 +1,266 @@
+"""
+Response compression with gzip, brotli and zstd negotiation.
+
+brotli and zstd are used only when the `brotli` / `zstandard` packages are
+installed. Complete bodies are compressed once and the compressed bytes are
+kept in a small LRU keyed by the response ETag (or a hash of the body), so
+identical payloads served from caches or ETag-validated paths are not
+recompressed. Streaming responses are compressed chunk by chunk.
+"""
+import gzip
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+import anyio
+from django.conf import settings
+
+from core.metrics import registry
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+
+# Bodies at least this large are compressed off the event loop
+OFFLOAD_SIZE = 256 * 1024
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml")
+
+
+def supported_encodings() -> list:
+    """Encodings we can produce, in order of preference"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Pick our preferred encoding among those the client accepts with q > 0"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    for encoding in supported_encodings():
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+class StreamCompressor:
+    """Incremental compressor that flushes after every chunk"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        elif encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == "gzip":
+            return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        if self.encoding == "gzip":
+            return self._compressor.flush()
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class CompressedCache:
+    """Byte-bounded LRU of compressed bodies keyed by (ETag or body hash, encoding)"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: tuple, value: bytes):
+        if len(value) > self.max_bytes // 4:
+            return  # one huge payload shouldn't flush everything else
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = value
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+compressed_cache = CompressedCache(settings.COMPRESSION_CACHE_BYTES)
+registry.register_cache("compression", compressed_cache.stats)
+
+
+def _header(headers, name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses of COMPRESSION_MIN_SIZE bytes or more"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = dict(scope["headers"]).get(b"accept-encoding", b"").decode("latin-1")
+        encoding = negotiate(accept) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        stream: Optional[StreamCompressor] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, stream, passthrough
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+                passthrough = (
+                    _header(headers, b"content-encoding") is not None
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    start_message = message  # held until we see the body
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if stream is None and start_message is not None and not more_body:
+                # Complete body in one message
+                await self._send_complete(send, start_message, body, encoding)
+                start_message = None
+                return
+
+            if stream is None:
+                stream = StreamCompressor(encoding)
+                headers = [
+                    (key, value) for key, value in start_message.get("headers", [])
+                    if key.lower() != b"content-length"
+                ]
+                headers += [(b"content-encoding", encoding.encode()), (b"vary", b"Accept-Encoding")]
+                await send({**start_message, "headers": headers})
+                start_message = None
+
+            data = stream.chunk(body) if body else b""
+            if not more_body:
+                data += stream.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _send_complete(self, send, start_message, body: bytes, encoding: str):
+        headers = start_message.get("headers", [])
+        if len(body) < settings.COMPRESSION_MIN_SIZE or start_message["status"] in (204, 304):
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        etag = _header(headers, b"etag")
+        key = (etag if etag is not None else hashlib.blake2b(body, digest_size=16).digest(), encoding)
+        compressed = compressed_cache.get(key)
+        if compressed is None:
+            if len(body) >= OFFLOAD_SIZE:
+                compressed = await anyio.to_thread.run_sync(compress, body, encoding)
+            else:
+                compressed = compress(body, encoding)
+            compressed_cache.set(key, compressed)
+
+        new_headers = []
+        for name, value in headers:
+            lowered = name.lower()
+            if lowered == b"content-length":
+                continue
+            if lowered == b"etag" and not value.startswith(b"W/"):
+                # The representation changed, so a strong validator would be wrong
+                value = b"W/" + value
+            new_headers.append((name, value))
+        new_headers += [
+            (b"content-encoding", encoding.encode()),
+            (b"content-length", str(len(compressed)).encode()),
+            (b"vary", b"Accept-Encoding"),
+        ]
+        await send({**start_message, "headers": new_headers})
+        await send({"type": "http.response.body", "body": compressed})
@@ -3,17 +3,11 @@ Database configuration for Django ORM with FastAPI
 """
 import os
 import django
-from django.conf import settings
+from django.apps import apps
 
-# Setup Django
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
-if not settings.configured:
-    django.setup()
-
-
-def setup_django():
-    """Initialize Django for use with FastAPI"""
-    if not settings.configured:
+def setup_django(settings_module: str = 'core.settings'):
+    """Initialize Django for use with FastAPI (safe to call more than once)"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    if not apps.ready:
         django.setup()
-
@@ -0,0 +1,146 @@
+"""
+Read replica routing.
+
+Handlers decorated with @replica_read send their queries to the `replica`
+database; everything else, and every write, uses `default`. After a user
+writes, their reads stay on the primary for REPLICA_STICKY_SECONDS so they
+see their own changes despite replication lag. The sticky marks live in the
+Django cache named by REPLICA_STICKY_CACHE (point it at a shared cache when
+running several workers).
+
+Responses stored in the response cache are always read from the primary
+(primary_reads()): a lagging replica would otherwise pin stale data under
+current tag versions until RESPONSE_CACHE_TTL. Likewise CoalescingMiddleware
+never lets a sticky caller share a replica read.
+
+ArchiveRouter sends ArchivedRecord to the `archive` database when
+ARCHIVE_DB_NAME configures one (core.archive).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Optional
+
+from django.conf import settings
+
+# Alias reads should use in this context (None = primary)
+_read_alias: ContextVar[Optional[str]] = ContextVar("read_alias", default=None)
+# Set while computing something that outlives the request (a cached response)
+_primary_only: ContextVar[bool] = ContextVar("primary_only", default=False)
+# [user_id, already marked sticky] for the request being handled
+_writer: ContextVar[Optional[list]] = ContextVar("replica_writer", default=None)
+
+REPLICA = "replica"
+ARCHIVE = "archive"
+ARCHIVED_RECORD = "models.ArchivedRecord"
+
+
+def _sticky_cache():
+    from django.core.cache import caches
+
+    return caches[settings.REPLICA_STICKY_CACHE]
+
+
+def is_sticky(user_id: int) -> bool:
+    return _sticky_cache().get(f"replica-sticky:{user_id}") is not None
+
+
+def mark_sticky(user_id: int):
+    _sticky_cache().set(f"replica-sticky:{user_id}", 1, timeout=settings.REPLICA_STICKY_SECONDS)
+
+
+def reads_primary(user_id: int) -> bool:
+    """Whether @replica_read handlers called by this user go to the primary"""
+    return REPLICA not in settings.DATABASES or is_sticky(user_id)
+
+
+@contextmanager
+def primary_reads():
+    """Keep @replica_read handlers called inside the block on the primary"""
+    token = _primary_only.set(True)
+    try:
+        yield
+    finally:
+        _primary_only.reset(token)
+
+
+class ReplicaRouter:
+    """Django database router: replica for @replica_read handlers, primary otherwise"""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or "default"
+
+    def db_for_write(self, model, **hints):
+        writer = _writer.get()
+        if writer is not None and not writer[1]:
+            writer[1] = True
+            mark_sticky(writer[0])
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # same data on both sides
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return True  # a real replica follows the primary; local SQLite copies are migrated too
+
+
+class ArchiveRouter:
+    """Keeps ArchivedRecord (and only it) in the `archive` database when one is configured"""
+
+    def _is_archive(self, model) -> bool:
+        return model._meta.label == ARCHIVED_RECORD
+
+    def db_for_read(self, model, **hints):
+        return ARCHIVE if self._is_archive(model) else None
+
+    def db_for_write(self, model, **hints):
+        return ARCHIVE if self._is_archive(model) else None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if model_name is None:
+            return None
+        is_archive = f"{app_label}.{model_name}" == ARCHIVED_RECORD.lower()
+        if db == ARCHIVE:
+            return is_archive
+        return False if is_archive else None
+
+
+def replica_read(func: Callable):
+    """Run a sync read-only handler against the replica unless its caller wrote recently"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        user = kwargs.get("current_user")
+        if (
+            REPLICA not in settings.DATABASES
+            or _primary_only.get()
+            or (user is not None and is_sticky(user.id))
+        ):
+            return func(*args, **kwargs)
+        token = _read_alias.set(REPLICA)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+
+    return wrapper
+
+
+class ReplicaStickinessMiddleware:
+    """Tells the router who is calling so their writes can pin them to the primary"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+
+        from core.auth import peek_token
+
+        claims = peek_token(scope, verify_version=False)
+        token = _writer.set([claims["user_id"], False] if claims is not None else None)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _writer.reset(token)
@@ -0,0 +1,143 @@
+"""
+IC decision engine.
+
+Each deal's DealDecision row keeps running vote counters: votes and vote
+weight for approve and decline. cast_vote adjusts them by the difference
+between the new vote and the one it replaced (Vote.upsert returns both),
+so a decision never rescans the votes and reading it is a primary key
+lookup.
+
+IC_DECISION rules:
+- weights: vote weight by role name or hierarchy_level (role name wins;
+  default 1)
+- quorum: votes needed before there is a decision
+- approve_threshold: approved once the approving share of the weight is
+  above this, declined otherwise
+- auto_advance: move a deal in IC to Invested / Passed when it is decided
+"""
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+PENDING = "pending"
+APPROVED = "approved"
+DECLINED = "declined"
+
+ADVANCE_TO = {APPROVED: "Invested", DECLINED: "Passed"}
+
+
+def weight_of(role_name: Optional[str], level: Optional[int]) -> int:
+    weights = settings.IC_DECISION['weights']
+    if role_name in weights:
+        return weights[role_name]
+    return weights.get(level, 1)
+
+
+def weight_for(user) -> int:
+    """A user's vote weight, from the compiled role registry (no query)"""
+    from core.permissions import role_of
+
+    role = role_of(user)
+    return weight_of(role.name, role.level) if role is not None else weight_of(None, None)
+
+
+def evaluate(approve_count: int, decline_count: int, approve_weight: int, decline_weight: int) -> str:
+    """Decision the counters add up to under IC_DECISION"""
+    rules = settings.IC_DECISION
+    if approve_count + decline_count < rules['quorum']:
+        return PENDING
+    total = approve_weight + decline_weight
+    if total and approve_weight / total > rules['approve_threshold']:
+        return APPROVED
+    return DECLINED
+
+
+def record_vote(vote, user):
+    """
+    Apply a vote returned by Vote.upsert to its deal's counters and update the
+    decision if that changes it; returns the deal's DealDecision, or None when
+    the vote changed nothing
+    """
+    from core.archive import archived_row
+    from models.models import DealDecision
+
+    if vote.previous_vote is None and vote.deal_in_cold_storage:
+        # The first hot vote on a cold deal replaces the user's archived one, if any
+        previous = archived_row(vote.deal_id, "vote", vote.user_id)
+        if previous is not None:
+            vote.previous_vote, vote.previous_weight = previous.vote, previous.weight
+
+    if vote.previous_vote == vote.vote and vote.previous_weight == vote.weight:
+        return None
+
+    deltas = {"approve": [0, 0], "decline": [0, 0]}  # vote -> [count, weight]
+    deltas[vote.vote][0] += 1
+    deltas[vote.vote][1] += vote.weight
+    if vote.previous_vote is not None:
+        deltas[vote.previous_vote][0] -= 1
+        deltas[vote.previous_vote][1] -= vote.previous_weight
+    decision = DealDecision.add(
+        vote.deal_id,
+        approve=deltas["approve"][0], decline=deltas["decline"][0],
+        approve_weight=deltas["approve"][1], decline_weight=deltas["decline"][1],
+    )
+
+    outcome = evaluate(decision.approve_count, decision.decline_count,
+                       decision.approve_weight, decision.decline_weight)
+    if outcome == decision.outcome:
+        return decision
+
+    # Only if no other vote moved the counters meanwhile; that vote's request decides instead
+    decided_at = timezone.now() if outcome != PENDING else None
+    updated = DealDecision.objects.filter(
+        deal_id=vote.deal_id,
+        approve_count=decision.approve_count, decline_count=decision.decline_count,
+        approve_weight=decision.approve_weight, decline_weight=decision.decline_weight,
+    ).update(outcome=outcome, decided_at=decided_at)
+    if updated:
+        decision.outcome, decision.decided_at = outcome, decided_at
+        if outcome != PENDING and settings.IC_DECISION['auto_advance']:
+            _advance(vote.deal_id, outcome, user)
+    return decision
+
+
+def _advance(deal_id: int, outcome: str, user):
+    """
+    Move a deal that is still in IC on to the stage its decision calls for,
+    if the workflow allows the move and the deal passes its guards
+    """
+    from core.cache import response_cache, deal_tag, DEALS_TAG
+    from core.jobs import log_activity
+    from core.workflow import get_workflow
+    from models.models import Deal
+
+    target = ADVANCE_TO[outcome]
+    workflow = get_workflow()
+    if not workflow.allowed("IC", target):
+        return
+    deal = None
+    if workflow.guards.get(target) or workflow.hooks.get(target):
+        deal = (
+            Deal.objects.annotate(**workflow.annotations(target))
+            .filter(id=deal_id, stage="IC", status="active")
+            .first()
+        )
+        if deal is None or workflow.failed_guard(deal, target):
+            return
+    now = timezone.now()
+    moved = Deal.objects.filter(id=deal_id, stage="IC", status="active").update(
+        stage=target, version=F("version") + 1, updated_at=now
+    )
+    if not moved:
+        return
+
+    if workflow.hooks.get(target):
+        deal.stage, deal.version, deal.updated_at = target, deal.version + 1, now
+        workflow.run_hooks(deal, "IC", user)
+    transaction.on_commit(
+        lambda: log_activity(deal_id, user.id, f"IC decision {outcome}: moved from IC to {target}")
+    )
+    transaction.on_commit(lambda: response_cache.invalidate(deal_tag(deal_id), DEALS_TAG))
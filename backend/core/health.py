@@ -0,0 +1,114 @@
+"""Liveness and readiness probes"""
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.db import connection
+
+# Flipped by the startup hook once the worker has finished warming up
+_ready = False
+
+_cached_report: Optional[dict] = None
+_cached_at = 0.0
+_migrations_applied = False
+
+
+def mark_ready():
+    global _ready, _cached_report
+    _ready = True
+    _cached_report = None
+
+
+def mark_unready():
+    global _ready, _cached_report
+    _ready = False
+    _cached_report = None
+
+
+def is_ready() -> bool:
+    return _ready
+
+
+def _database_latency_ms() -> float:
+    start = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    return (time.perf_counter() - start) * 1000
+
+
+def _pending_migrations() -> list:
+    """
+    Names of unapplied migrations.
+    Once everything is applied the answer can't change until the code does
+    (i.e. a restart), so the migration graph is not reloaded after that.
+    """
+    global _migrations_applied
+    if _migrations_applied:
+        return []
+    from django.db.migrations.executor import MigrationExecutor
+
+    executor = MigrationExecutor(connection)
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    pending = [f"{migration.app_label}.{migration.name}" for migration, _ in plan]
+    _migrations_applied = not pending
+    return pending
+
+
+def check_database() -> dict:
+    """Run the database checks (blocking; call from the threadpool)"""
+    try:
+        latency_ms = _database_latency_ms()
+        pending = _pending_migrations()
+    except Exception as exc:
+        return {"status": "error", "error": str(exc)}
+    return {
+        "status": "ok" if not pending else "pending_migrations",
+        "latency_ms": round(latency_ms, 2),
+        "pending_migrations": pending,
+    }
+
+
+def threadpool_stats() -> dict:
+    """AnyIO threadpool usage (must be called from the event loop)"""
+    from anyio import to_thread
+
+    limiter = to_thread.current_default_thread_limiter()
+    return {
+        "limit": limiter.total_tokens,
+        "busy": limiter.borrowed_tokens,
+        "queued": limiter.statistics().tasks_waiting,
+    }
+
+
+async def readiness_report() -> dict:
+    """
+    Readiness of this worker. Results are cached for HEALTH_CHECK_CACHE_SECONDS
+    so frequent load balancer probes don't add database load.
+    """
+    global _cached_report, _cached_at
+    import anyio
+    from fastapi.concurrency import run_in_threadpool
+
+    now = time.monotonic()
+    if _cached_report is not None and now - _cached_at < settings.HEALTH_CHECK_CACHE_SECONDS:
+        return _cached_report
+
+    threadpool = threadpool_stats()
+    database = {"status": "timeout"}
+    with anyio.move_on_after(settings.HEALTH_CHECK_DB_TIMEOUT):
+        database = await run_in_threadpool(check_database)
+
+    ready = (
+        _ready
+        and database["status"] == "ok"
+        and threadpool["queued"] <= settings.HEALTH_MAX_THREADPOOL_QUEUE
+    )
+    _cached_report = {
+        "status": "ready" if ready else "unready",
+        "warming_up": not _ready,
+        "database": database,
+        "threadpool": threadpool,
+    }
+    _cached_at = now
+    return _cached_report
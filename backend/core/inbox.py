@@ -0,0 +1,85 @@
+"""
+Per-user deal inbox.
+
+Every deal a user owns, commented on or voted on has an InboxEntry holding
+the user's read watermark (last_seen_at) and how many changes other users
+made since then. Write handlers report changes with deal_event(); the
+"inbox" background job (core.jobs) applies a batch of them with one
+INSERT ... ON CONFLICT DO NOTHING for new followers and one UPDATE per
+changed deal. /api/me/inbox then reads only the user's own entries.
+
+An event only counts for followers whose watermark is older than the event,
+so a change that was still queued when the user marked the deal seen doesn't
+show up as unread afterwards.
+"""
+from collections import defaultdict
+from typing import List, Optional
+
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.jobs import enqueue
+
+OWNER = "owner"
+COMMENT = "comment"
+VOTE = "vote"
+
+
+def deal_event(deal_id: int, user_id: int, follow: Optional[str] = None):
+    """
+    Record that a user changed a deal. With `follow` (OWNER, COMMENT, VOTE)
+    the deal also joins the user's inbox if it isn't there yet.
+    """
+    enqueue("inbox", {
+        "deal_id": deal_id,
+        "user_id": user_id,
+        "follow": follow,
+        "at": timezone.now().isoformat(),
+    })
+
+
+def apply_events(payloads: List[dict]):
+    """Batch handler for the "inbox" job kind"""
+    from models.models import InboxEntry
+
+    events = defaultdict(list)  # deal_id -> [(user_id, at)]
+    follows = []
+    for payload in payloads:
+        at = parse_datetime(payload["at"])
+        events[payload["deal_id"]].append((payload["user_id"], at))
+        if payload["follow"]:
+            follows.append(InboxEntry(
+                user_id=payload["user_id"], deal_id=payload["deal_id"], reason=payload["follow"],
+                last_activity_at=at, last_seen_at=at,
+            ))
+    InboxEntry.objects.bulk_create(follows, ignore_conflicts=True)
+
+    for deal_id, changes in events.items():
+        # +1 for every change made by someone else after the follower's watermark
+        unread = sum(
+            (
+                Case(
+                    When(Q(last_seen_at__lt=at) & ~Q(user_id=user_id), then=Value(1)),
+                    default=Value(0),
+                    output_field=IntegerField(),
+                )
+                for user_id, at in changes
+            ),
+            start=F("unread_count"),
+        )
+        InboxEntry.objects.filter(deal_id=deal_id).update(
+            unread_count=unread,
+            last_activity_at=Greatest("last_activity_at", Value(max(at for _, at in changes))),
+        )
+
+
+def mark_seen(user_id: int, deal_id: int) -> bool:
+    """Move the user's watermark for a deal to now; False if the deal isn't in their inbox"""
+    from models.models import InboxEntry
+
+    return bool(
+        InboxEntry.objects.filter(user_id=user_id, deal_id=deal_id)
+        .update(unread_count=0, last_seen_at=timezone.now())
+    )
@@ -0,0 +1,160 @@
+"""Per-request SQL query counting and slow-query logging"""
+import logging
+import re
+import time
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import List, Optional
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# A query's origin is the innermost stack frame from our own code under backend/
+BACKEND_DIR = str(Path(__file__).resolve().parent.parent)
+_IGNORED_ORIGINS = ("site-packages", "dist-packages", __file__)
+
+_current_stats: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+
+
+class QueryStats:
+    """Query counters collected for a single request (or test block)"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.queries: List[dict] = []
+
+    @property
+    def duration_ms(self) -> float:
+        return self.duration * 1000
+
+    def record(self, sql: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        self.queries.append({"sql": sql, "duration_ms": round(duration * 1000, 3)})
+
+
+def _query_origin() -> str:
+    """Return the innermost application frame that triggered the current query"""
+    for frame in reversed(traceback.extract_stack()[:-1]):
+        if frame.filename.startswith(BACKEND_DIR) and not frame.filename.endswith(_IGNORED_ORIGINS):
+            return f"{frame.filename[len(BACKEND_DIR) + 1:]}:{frame.lineno} in {frame.name}"
+    return "<unknown>"
+
+
+def query_wrapper(execute, sql, params, many, context):
+    """
+    Django execute wrapper that times every query.
+    Queries are attributed to the QueryStats bound to the current context;
+    anything slower than SLOW_QUERY_THRESHOLD_MS is logged with its origin.
+    """
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.record(sql, duration)
+        if duration * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+            logger.warning(
+                "Slow query (%.1f ms) from %s: %s",
+                duration * 1000, _query_origin(), sql,
+            )
+
+
+def install_query_wrapper(sender=None, connection=None, **kwargs):
+    """Attach query_wrapper to a database connection (idempotent)"""
+    if query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_wrapper)
+
+
+def enable_query_instrumentation():
+    """
+    Instrument every database connection.
+    Connections are thread-local and opened lazily inside the threadpool, so the
+    wrapper is attached as each connection is created rather than in the middleware.
+    """
+    connection_created.connect(install_query_wrapper, dispatch_uid="query_instrumentation")
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """QueryStats for the request being handled in this context, if any"""
+    return _current_stats.get()
+
+
+@contextmanager
+def count_queries():
+    """Collect query statistics for the enclosed block"""
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def query_count(response) -> int:
+    """Read the query count reported in a response's Server-Timing header"""
+    match = re.search(r'db;[^,]*desc="(\d+) queries"', response.headers.get("server-timing", ""))
+    if match is None:
+        raise AssertionError("Response has no Server-Timing db entry; is QueryCountMiddleware installed?")
+    return int(match.group(1))
+
+
+def assert_max_queries(response, max_queries: int):
+    """
+    Test helper: fail if the request behind a response ran more than max_queries queries.
+
+    Usage:
+        response = client.get("/api/deals", headers=auth_headers)
+        assert_max_queries(response, 2)
+    """
+    executed = query_count(response)
+    if executed > max_queries:
+        raise AssertionError(
+            f"{response.request.method} {response.request.url.path} ran {executed} queries "
+            f"(expected at most {max_queries})"
+        )
+
+
+class QueryCountMiddleware:
+    """
+    ASGI middleware that counts queries and DB time for each HTTP request
+    and reports them in a Server-Timing response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - start) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((
+                    b"server-timing",
+                    (
+                        f'db;dur={stats.duration_ms:.2f};desc="{stats.count} queries", '
+                        f"app;dur={total_ms:.2f}"
+                    ).encode("latin-1"),
+                ))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
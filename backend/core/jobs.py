@@ -0,0 +1,239 @@
+"""
+In-process background jobs for side effects that don't shape the response.
+
+Handlers enqueue jobs (e.g. an activity log entry) and return. A task on the
+event loop flushes the queue every JOBS_FLUSH_INTERVAL seconds, running each
+kind's handler once per batch in the threadpool (activities become a single
+bulk_create).
+
+With JOBS_DURABLE every job is also written to the OutboxJob table, leased
+to this worker, and deleted after its handler succeeds. Rows whose lease ran
+out (worker crashed or the handler failed) are claimed again by a live
+worker, so a job runs at least once and may run twice.
+
+JOBS_SYNC runs every job inline at enqueue time (tests, scripts). Jobs
+enqueued while no flusher is running (management commands, seed_data) also
+run inline.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+jobs_processed_total = registry.counter(
+    "jobs_processed_total", "Background jobs run successfully", ("kind",))
+jobs_failed_total = registry.counter(
+    "jobs_failed_total", "Background job batches that raised", ("kind",))
+jobs_pending = registry.gauge(
+    "jobs_pending", "Background jobs waiting for the next flush")
+
+# kind -> handler taking a list of payloads
+_handlers: Dict[str, Callable[[List[dict]], None]] = {}
+
+
+def job_handler(kind: str):
+    """Register the batch handler for a job kind"""
+    def decorator(func: Callable[[List[dict]], None]):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+class JobQueue:
+    def __init__(self):
+        # (kind, payload, outbox id or None, attempts)
+        self._pending: List[Tuple[str, dict, Optional[int], int]] = []
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._recovered_at = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def enqueue(self, kind: str, payload: dict):
+        if settings.JOBS_SYNC or not self.running:
+            self._run(kind, [payload])
+            return
+        outbox_id = None
+        if settings.JOBS_DURABLE:
+            from models.models import OutboxJob
+
+            outbox_id = OutboxJob.objects.create(
+                kind=kind, payload=payload, locked_by=WORKER_ID, locked_at=timezone.now()
+            ).id
+        with self._lock:
+            self._pending.append((kind, payload, outbox_id, 0))
+
+    def _run(self, kind: str, payloads: List[dict]):
+        _handlers[kind](payloads)
+        jobs_processed_total.inc(len(payloads), kind=kind)
+
+    def _run_batch(self, kind: str, jobs: list) -> Tuple[list, list]:
+        """
+        Run a kind's jobs as one batch; if the batch fails, run them one at a
+        time so a bad payload only fails itself. Returns (done, failed) jobs.
+        """
+        try:
+            self._run(kind, [job[1] for job in jobs])
+            return jobs, []
+        except Exception:
+            jobs_failed_total.inc(kind=kind)
+            if len(jobs) == 1:
+                logger.exception("Background job %s failed: %r", kind, jobs[0][1])
+                return [], jobs
+            logger.exception("Background job batch %s failed (%d jobs); retrying one at a time", kind, len(jobs))
+
+        done, failed = [], []
+        for job in jobs:
+            try:
+                self._run(kind, [job[1]])
+                done.append(job)
+            except Exception:
+                jobs_failed_total.inc(kind=kind)
+                logger.exception("Background job %s failed: %r", kind, job[1])
+                failed.append(job)
+        return done, failed
+
+    def flush(self):
+        """Run everything queued so far, one handler call per kind (blocking)"""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        by_kind: Dict[str, list] = {}
+        for job in batch:
+            by_kind.setdefault(job[0], []).append(job)
+
+        done_ids = []
+        for kind, jobs in by_kind.items():
+            done, failed = self._run_batch(kind, jobs)
+            # Durable jobs come back through recover() once their lease expires
+            retry = [
+                (k, payload, outbox_id, attempts + 1)
+                for k, payload, outbox_id, attempts in failed
+                if outbox_id is None and attempts + 1 < settings.JOBS_MAX_ATTEMPTS
+            ]
+            with self._lock:
+                self._pending.extend(retry)
+            done_ids += [job[2] for job in done if job[2] is not None]
+
+        if done_ids:
+            from models.models import OutboxJob
+
+            OutboxJob.objects.filter(id__in=done_ids).delete()
+
+    def recover(self):
+        """Claim outbox rows whose lease expired and queue them again (blocking)"""
+        from models.models import OutboxJob
+
+        now = timezone.now()
+        stale = OutboxJob.objects.filter(
+            locked_at__lt=now - timedelta(seconds=settings.JOBS_LEASE_SECONDS),
+            attempts__lt=settings.JOBS_MAX_ATTEMPTS,
+        )
+        ids = list(stale.values_list('id', flat=True)[:settings.JOBS_RECOVER_BATCH])
+        if not ids:
+            return
+        # Conditional update, so two workers never both claim the same row
+        stale.filter(id__in=ids).update(locked_by=WORKER_ID, locked_at=now)
+        claimed = OutboxJob.objects.filter(id__in=ids, locked_by=WORKER_ID, locked_at=now)
+        jobs = [(row.kind, row.payload, row.id, row.attempts) for row in claimed]
+        OutboxJob.objects.filter(id__in=[job[2] for job in jobs]).update(attempts=F('attempts') + 1)
+        with self._lock:
+            self._pending.extend(jobs)
+        logger.warning("Recovered %d background jobs from the outbox", len(jobs))
+
+    async def _loop(self):
+        from fastapi.concurrency import run_in_threadpool
+
+        while True:
+            await asyncio.sleep(settings.JOBS_FLUSH_INTERVAL)
+            try:
+                if settings.JOBS_DURABLE and time.monotonic() - self._recovered_at > settings.JOBS_LEASE_SECONDS:
+                    self._recovered_at = time.monotonic()
+                    await run_in_threadpool(self.recover)
+                if self._pending:
+                    await run_in_threadpool(self.flush)
+            except Exception:
+                logger.exception("Background job flush failed")
+
+    def start(self):
+        """Start flushing from the running event loop"""
+        if not self.running:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self):
+        """Stop the flusher and run whatever is still queued, retries included"""
+        from fastapi.concurrency import run_in_threadpool
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Failed jobs are queued again until they run out of attempts
+        while self._pending:
+            await run_in_threadpool(self.flush)
+
+
+job_queue = JobQueue()
+registry.register_collector(lambda: jobs_pending.set(job_queue.pending()))
+
+
+def enqueue(kind: str, payload: dict):
+    job_queue.enqueue(kind, payload)
+
+
+# Job kinds
+
+@job_handler("activity")
+def write_activities(payloads: List[dict]):
+    from models.models import Activity
+
+    Activity.objects.bulk_create([
+        Activity(
+            deal_id=payload["deal_id"],
+            user_id=payload["user_id"],
+            action=payload["action"],
+            created_at=payload["created_at"],
+        )
+        for payload in payloads
+    ])
+
+
+@job_handler("inbox")
+def update_inboxes(payloads: List[dict]):
+    from core.inbox import apply_events
+
+    apply_events(payloads)
+
+
+def log_activity(deal_id: int, user_id: int, action: str, follow: Optional[str] = None):
+    """Record an activity log entry in the background (and count it in followers' inboxes)"""
+    from core.inbox import deal_event
+
+    enqueue("activity", {
+        "deal_id": deal_id,
+        "user_id": user_id,
+        "action": action,
+        "created_at": timezone.now().isoformat(),
+    })
+    deal_event(deal_id, user_id, follow)
@@ -0,0 +1,116 @@
+"""
+Batched primary-key lookups, DataLoader style.
+
+A Loader collects the ids a request is going to need (want()) and fetches
+every pending one with a single `pk__in` query the first time any of them is
+read; rows (and misses) are then remembered for the rest of the request, so
+asking again for an id already seen costs nothing.
+
+loader_for("deal" | "user") returns the current request's loader for that
+type. LoaderMiddleware gives every HTTP request its own set; outside a
+request (jobs, management commands) each call gets a fresh loader, so nothing
+is cached across unrelated work. Roles need no loader: core.permissions
+serves them from its compiled registry without a query.
+"""
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from django.db.models import QuerySet
+
+# type -> queryset the loader reads through (built lazily: models import late)
+LOADERS: Dict[str, Callable[[], QuerySet]] = {}
+
+# SQLite caps bound parameters per statement; keep each IN list well under it
+CHUNK_SIZE = 500
+
+_loaders: ContextVar[Optional[Dict[str, "Loader"]]] = ContextVar("loaders", default=None)
+
+
+def register_loader(name: str, queryset: Callable[[], QuerySet]):
+    LOADERS[name] = queryset
+
+
+def _deals():
+    from models.models import Deal
+
+    return Deal.objects.select_related('owner', 'owner__role')
+
+
+def _users():
+    from models.models import User
+
+    return User.objects.select_related('role')
+
+
+register_loader("deal", _deals)
+register_loader("user", _users)
+
+
+class Loader:
+    """Rows of one queryset by primary key, fetched in batches and cached"""
+
+    def __init__(self, queryset: QuerySet):
+        self.queryset = queryset
+        self._rows: Dict[Any, Any] = {}  # pk -> instance, or None for a miss
+        self._pending = set()
+
+    def want(self, ids: Iterable) -> "Loader":
+        """Queue ids for the next batch"""
+        self._pending.update(pk for pk in ids if pk not in self._rows)
+        return self
+
+    def prime(self, obj):
+        """Seed the cache with an instance the caller already holds"""
+        self._rows[obj.pk] = obj
+        self._pending.discard(obj.pk)
+
+    def get(self, pk) -> Optional[Any]:
+        self.want([pk])._flush()
+        return self._rows[pk]
+
+    def get_many(self, ids: Iterable) -> List:
+        """Instances for `ids` in the order given, skipping ids with no row"""
+        ids = list(ids)
+        self.want(ids)._flush()
+        return [self._rows[pk] for pk in ids if self._rows[pk] is not None]
+
+    def _flush(self):
+        pending = sorted(self._pending)
+        self._pending.clear()
+        for start in range(0, len(pending), CHUNK_SIZE):
+            chunk = pending[start:start + CHUNK_SIZE]
+            found = {obj.pk: obj for obj in self.queryset.filter(pk__in=chunk).order_by()}
+            for pk in chunk:
+                self._rows[pk] = found.get(pk)
+
+
+def loader_for(name: str) -> Loader:
+    """The current request's loader for `name` (a fresh one outside a request)"""
+    loaders = _loaders.get()
+    if loaders is None:
+        return Loader(LOADERS[name]())
+    if name not in loaders:
+        loaders[name] = Loader(LOADERS[name]())
+    return loaders[name]
+
+
+class LoaderMiddleware:
+    """
+    ASGI middleware that gives each HTTP request its own loaders.
+    Sync handlers run in the threadpool with a copy of this context, which
+    still refers to the same dict, so dependencies and the handler share it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = _loaders.set({})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _loaders.reset(token)
@@ -0,0 +1,351 @@
+"""
+In-process Prometheus-style metrics.
+
+Counters, gauges and histograms are plain dicts guarded by a lock, so recording
+a sample costs a dict lookup and an addition. With METRICS_MULTIPROC_DIR set,
+every worker periodically writes a snapshot of its samples to that directory
+and /metrics sums the snapshots of all live workers.
+"""
+import json
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (sample name, sorted label pairs) -> value
+Samples = Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]
+
+
+class Metric:
+    """Base class for a labelled metric family"""
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: Dict[tuple, float] = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: tuple) -> Tuple[Tuple[str, str], ...]:
+        return tuple(zip(self.labelnames, key))
+
+    def samples(self) -> Samples:
+        with self._lock:
+            return {(self.name, self._labels(key)): value for key, value in self._values.items()}
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        # label key -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[tuple, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self) -> Samples:
+        samples = {}
+        with self._lock:
+            series_items = [(key, list(series)) for key, series in self._series.items()]
+        for key, series in series_items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                samples[(f"{self.name}_bucket", labels + (("le", le),))] = cumulative
+            samples[(f"{self.name}_count", labels)] = cumulative
+            samples[(f"{self.name}_sum", labels)] = series[-1]
+        return samples
+
+
+class Registry:
+    """Holds metric families plus scrape-time collectors"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._caches: Dict[str, Callable[[], dict]] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], None]):
+        """Register a callable that refreshes gauges right before a snapshot"""
+        self._collectors.append(collector)
+
+    def register_cache(self, name: str, stats: Callable[[], dict]):
+        """
+        Expose a cache's statistics. `stats` returns a dict with at least
+        `hits` and `misses`, plus optional `evictions`, `size`, `bytes` and
+        the `max_bytes` / `max_entries` caps.
+        """
+        self._caches[name] = stats
+
+    def families(self) -> List[Metric]:
+        return list(self._metrics.values())
+
+    def snapshot(self) -> Samples:
+        for collector in self._collectors:
+            collector()
+        for name, stats in self._caches.items():
+            values = stats()
+            for field in ("hits", "misses", "evictions", "size", "bytes", "max_bytes", "max_entries"):
+                if field in values:
+                    cache_stat.set(values[field], cache=name, stat=field)
+        samples: Samples = {}
+        for metric in self._metrics.values():
+            samples.update(metric.samples())
+        return samples
+
+
+registry = Registry()
+
+http_requests_total = registry.counter(
+    "http_requests_total", "HTTP requests handled", ("method", "route", "status"))
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled")
+threadpool_threads = registry.gauge(
+    "threadpool_threads", "AnyIO worker threadpool usage", ("state",))
+db_queries_total = registry.counter(
+    "db_queries_total", "SQL queries executed while handling requests")
+db_query_duration_seconds_total = registry.counter(
+    "db_query_duration_seconds_total", "Time spent in SQL queries while handling requests")
+db_connections = registry.gauge(
+    "db_connections", "Database connections held by this process", ("state",))
+cache_stat = registry.gauge(
+    "cache_stat", "Cache statistics (hits, misses, evictions, size, bytes and their caps)", ("cache", "stat"))
+
+
+# Database connections are thread-local; keep weak references so we can count them
+_connections = weakref.WeakSet()
+
+
+def _track_connection(sender=None, connection=None, **kwargs):
+    _connections.add(connection)
+
+
+connection_created.connect(_track_connection, dispatch_uid="metrics_connections")
+
+
+def _collect_db_connections():
+    wrappers = list(_connections)
+    db_connections.set(len(wrappers), state="created")
+    db_connections.set(sum(1 for w in wrappers if w.connection is not None), state="open")
+
+
+def _collect_threadpool():
+    from anyio import to_thread
+
+    try:
+        limiter = to_thread.current_default_thread_limiter()
+    except RuntimeError:  # no running event loop in this thread
+        return
+    threadpool_threads.set(limiter.total_tokens, state="limit")
+    threadpool_threads.set(limiter.borrowed_tokens, state="busy")
+    threadpool_threads.set(limiter.statistics().tasks_waiting, state="queued")
+
+
+registry.register_collector(_collect_db_connections)
+registry.register_collector(_collect_threadpool)
+
+
+# Multi-worker snapshots
+
+_last_flush = 0.0
+
+
+def _snapshot_path(pid: int) -> Path:
+    return Path(settings.METRICS_MULTIPROC_DIR) / f"metrics-{pid}.json"
+
+
+def flush_snapshot(force: bool = False):
+    """Write this worker's samples to METRICS_MULTIPROC_DIR (rate-limited)"""
+    global _last_flush
+    if not settings.METRICS_MULTIPROC_DIR:
+        return
+    now = time.monotonic()
+    if not force and now - _last_flush < settings.METRICS_FLUSH_INTERVAL:
+        return
+    _last_flush = now
+    path = _snapshot_path(os.getpid())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = [[name, list(labels), value] for (name, labels), value in registry.snapshot().items()]
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(payload))
+    tmp.replace(path)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def collect() -> Samples:
+    """Samples for this process, summed with other live workers' snapshots"""
+    samples = registry.snapshot()
+    if not settings.METRICS_MULTIPROC_DIR:
+        return samples
+    flush_snapshot(force=True)
+    samples = {}
+    for path in Path(settings.METRICS_MULTIPROC_DIR).glob("metrics-*.json"):
+        pid = int(path.stem.split("-", 1)[1])
+        if pid != os.getpid() and not _pid_alive(pid):
+            path.unlink(missing_ok=True)
+            continue
+        try:
+            payload = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        for name, labels, value in payload:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            samples[key] = samples.get(key, 0) + value
+    return samples
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def render(samples: Optional[Samples] = None) -> str:
+    """Render samples in the Prometheus text exposition format"""
+    samples = collect() if samples is None else samples
+    by_name: Dict[str, list] = {}
+    for (name, labels), value in samples.items():
+        by_name.setdefault(name, []).append((labels, value))
+
+    lines = []
+    for metric in registry.families():
+        names = [metric.name]
+        if metric.type == "histogram":
+            names = [f"{metric.name}_bucket", f"{metric.name}_count", f"{metric.name}_sum"]
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for name in names:
+            for labels, value in sorted(by_name.get(name, [])):
+                lines.append(f"{name}{_format_labels(labels)} {value:g}")
+
+    # Hit ratio is derived after summing workers, since ratios don't add up
+    cache_values = {labels: value for labels, value in by_name.get("cache_stat", [])}
+    caches = sorted({dict(labels)["cache"] for labels in cache_values})
+    if caches:
+        lines.append("# HELP cache_hit_ratio Cache hits / (hits + misses)")
+        lines.append("# TYPE cache_hit_ratio gauge")
+        for cache in caches:
+            hits = cache_values.get((("cache", cache), ("stat", "hits")), 0)
+            misses = cache_values.get((("cache", cache), ("stat", "misses")), 0)
+            ratio = hits / (hits + misses) if hits + misses else 0
+            lines.append(f'cache_hit_ratio{{cache="{cache}"}} {ratio:g}')
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route request counts, latency and in-flight requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        from core.instrumentation import current_query_stats
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            route = scope.get("route")
+            # Unmatched paths share one label so scanners can't explode cardinality
+            route_path = getattr(route, "path", "<unmatched>")
+            method = scope["method"]
+            http_requests_total.inc(method=method, route=route_path, status=status_code)
+            http_request_duration_seconds.observe(
+                time.perf_counter() - start, method=method, route=route_path)
+            stats = current_query_stats()
+            if stats is not None:
+                db_queries_total.inc(stats.count)
+                db_query_duration_seconds_total.inc(stats.duration)
+            flush_snapshot()
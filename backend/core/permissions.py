@@ -1,7 +1,116 @@
 """Permission checking utilities and decorators"""
+import threading
+import time
 from functools import wraps
 from fastapi import HTTPException, status
-from typing import Callable
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+
+ADMIN = 'Admin'
+ANALYST = 'Analyst'
+PARTNER = 'Partner'
+
+# Roles allowed to vote on deals (not a hierarchy: Analysts can't vote)
+VOTING_ROLES = frozenset({ADMIN, PARTNER})
+
+
+class CompiledRole:
+    """A Role reduced to what permission checks need"""
+    __slots__ = ('id', 'name', 'level', 'permissions', 'mask')
+
+    def __init__(self, id: int, name: str, level: int, permissions: frozenset, mask: int):
+        self.id = id
+        self.name = name
+        self.level = level
+        self.permissions = permissions
+        self.mask = mask
+
+
+class PermissionRegistry:
+    """
+    Every Role loaded once and compiled to a frozenset plus a bitmask over all
+    known permission names (for checking several permissions in one AND).
+    Invalidated by Role save/delete signals in this process and reloaded at
+    least every PERMISSION_REGISTRY_TTL seconds so edits made elsewhere
+    (admin, other workers) are picked up.
+    """
+
+    def __init__(self):
+        self._roles: Dict[int, CompiledRole] = {}
+        self._levels: Dict[str, int] = {}
+        self._bits: Dict[str, int] = {}
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def _load(self):
+        from models.models import Role
+
+        roles = list(Role.objects.values_list('id', 'name', 'hierarchy_level', 'permissions'))
+        bits: Dict[str, int] = {}
+        for _, _, _, permissions in roles:
+            for permission in permissions or []:
+                bits.setdefault(permission, 1 << len(bits))
+        compiled = {}
+        for role_id, name, level, permissions in roles:
+            permissions = frozenset(permissions or [])
+            mask = 0
+            for permission in permissions:
+                mask |= bits[permission]
+            compiled[role_id] = CompiledRole(role_id, name, level, permissions, mask)
+        self._bits = bits
+        self._levels = {role.name: role.level for role in compiled.values()}
+        self._roles = compiled
+        self._expires_at = time.monotonic() + settings.PERMISSION_REGISTRY_TTL
+        self.loads += 1
+
+    def _ensure_loaded(self):
+        if time.monotonic() >= self._expires_at:
+            with self._lock:
+                if time.monotonic() >= self._expires_at:
+                    self._load()
+
+    def invalidate(self):
+        self._expires_at = 0.0
+
+    def role(self, role_id: Optional[int]) -> Optional[CompiledRole]:
+        if role_id is None:
+            return None
+        self._ensure_loaded()
+        role = self._roles.get(role_id)
+        if role is None:
+            # A role created since the last load
+            self.invalidate()
+            self._ensure_loaded()
+            role = self._roles.get(role_id)
+        return role
+
+    def level(self, role_name: str) -> int:
+        """hierarchy_level of a role by name (unknown roles rank above everything)"""
+        self._ensure_loaded()
+        return self._levels.get(role_name, 1 << 30)
+
+    def mask(self, *permissions: str) -> Optional[int]:
+        """Bitmask for a set of permissions (None if any of them is unknown)"""
+        self._ensure_loaded()
+        mask = 0
+        for permission in permissions:
+            bit = self._bits.get(permission)
+            if bit is None:
+                return None
+            mask |= bit
+        return mask
+
+
+permission_registry = PermissionRegistry()
+
+
+def role_of(user) -> Optional[CompiledRole]:
+    """Compiled role of a user (by role_id, so user.role is never lazy-loaded)"""
+    if not user:
+        return None
+    return permission_registry.role(user.role_id)
 
 
 def require_role(*allowed_roles: str):
@@ -9,6 +118,8 @@ def require_role(*allowed_roles: str):
     Decorator to require specific role(s) for an endpoint
     Usage: @require_role("Admin", "Analyst")
     """
+    allowed = frozenset(allowed_roles)
+
     def decorator(func: Callable):
         @wraps(func)
         async def wrapper(*args, current_user=None, **kwargs):
@@ -17,30 +128,45 @@ def require_role(*allowed_roles: str):
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Not authenticated"
                 )
-            
-            if not current_user.role:
+
+            role = role_of(current_user)
+            if not role:
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="User has no role assigned"
                 )
-            
-            if current_user.role.name not in allowed_roles:
+
+            if role.name not in allowed:
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail=f"Permission denied. Required role: {', '.join(allowed_roles)}"
                 )
-            
+
             return await func(*args, current_user=current_user, **kwargs)
-        
+
         return wrapper
     return decorator
 
 
 def check_permission(user, permission: str) -> bool:
     """Check if user has a specific permission"""
-    if not user or not user.role:
+    role = role_of(user)
+    return role is not None and permission in role.permissions
+
+
+def has_all_permissions(user, *permissions: str) -> bool:
+    """Check several permissions at once with a single mask comparison"""
+    role = role_of(user)
+    if role is None:
         return False
-    return permission in user.role.permissions
+    mask = permission_registry.mask(*permissions)
+    return mask is not None and role.mask & mask == mask
+
+
+def has_level(user, role_name: str) -> bool:
+    """Check if user's hierarchy_level is at least that of `role_name`"""
+    role = role_of(user)
+    return role is not None and role.level >= permission_registry.level(role_name)
 
 
 def require_permission(permission: str):
@@ -55,32 +181,33 @@ def require_permission(permission: str):
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Not authenticated"
                 )
-            
+
             if not check_permission(current_user, permission):
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail=f"Permission denied. Required permission: {permission}"
                 )
-            
+
             return await func(*args, current_user=current_user, **kwargs)
-        
+
         return wrapper
     return decorator
 
 
 def is_admin(user) -> bool:
     """Check if user is Admin"""
-    return user and user.role and user.role.name == 'Admin'
+    role = role_of(user)
+    return role is not None and role.name == ADMIN
 
 
 def is_analyst_or_above(user) -> bool:
-    """Check if user is Analyst or Admin"""
-    return user and user.role and user.role.name in ['Admin', 'Analyst']
+    """Check if user is Analyst or higher in the hierarchy (Admin)"""
+    return has_level(user, ANALYST)
 
 
 def is_partner_or_above(user) -> bool:
-    """Check if user is Partner, Analyst, or Admin"""
-    return user and user.role and user.role.name in ['Admin', 'Analyst', 'Partner']
+    """Check if user is Partner or higher in the hierarchy (Analyst, Admin)"""
+    return has_level(user, PARTNER)
 
 
 def can_edit_deal(user, deal) -> bool:
@@ -94,5 +221,5 @@ def can_edit_deal(user, deal) -> bool:
 
 def can_vote(user) -> bool:
     """Check if user can vote on deals"""
-    return user and user.role and user.role.name in ['Admin', 'Partner']
-
+    role = role_of(user)
+    return role is not None and role.name in VOTING_ROLES
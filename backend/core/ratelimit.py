@@ -0,0 +1,207 @@
+"""
+Token bucket rate limiting.
+
+Buckets are keyed by user id (read from the JWT without a DB query) or by
+client IP for unauthenticated calls, per route. Limits come from
+RATE_LIMITS ("METHOD /route/{template}" -> "N/period") with
+RATE_LIMIT_DEFAULT for every other route. The bucket store is pluggable via
+RATE_LIMIT_BACKEND: MemoryBackend is per process, SQLiteBackend shares
+buckets between the workers on a host through a small SQLite file.
+"""
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+
+import anyio
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from core.auth import peek_token
+from core.routing import match_route
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_rate(rate: str) -> Tuple[int, float]:
+    """'10/minute' -> (capacity 10, refill 10/60 tokens per second)"""
+    count, _, period = rate.partition("/")
+    capacity = int(count)
+    return capacity, capacity / PERIODS[period.strip().rstrip("s")]
+
+
+def refill(tokens: float, updated_at: float, capacity: int, rate: float, now: float) -> float:
+    return min(capacity, tokens + (now - updated_at) * rate)
+
+
+class MemoryBackend:
+    """Per-process buckets; full buckets are pruned so memory stays bounded"""
+
+    PRUNE_INTERVAL = 60
+    blocking = False  # cheap enough to run on the event loop
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._pruned_at = time.monotonic()
+
+    def take(self, key: str, capacity: int, rate: float) -> Tuple[bool, float, float]:
+        """Take one token. Returns (allowed, tokens left, seconds until a token is available)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at, _ = self._buckets.get(key, (capacity, now, 0))
+            tokens = refill(tokens, updated_at, capacity, rate, now)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            # Kept with the bucket: the time it takes to refill completely under its own limit
+            self._buckets[key] = (tokens, now, (capacity - tokens) / rate if rate else 0)
+            if now - self._pruned_at > self.PRUNE_INTERVAL:
+                self._prune(now)
+        return allowed, tokens, 0.0 if allowed else (1 - tokens) / rate
+
+    def _prune(self, now: float):
+        # A bucket idle long enough to have refilled completely is equivalent to no bucket
+        self._buckets = {
+            key: value for key, value in self._buckets.items() if now - value[1] < value[2]
+        }
+        self._pruned_at = now
+
+
+class SQLiteBackend:
+    """
+    Buckets shared by all workers on one host, stored in RATE_LIMIT_SQLITE_PATH.
+    Each take is one short IMMEDIATE transaction on a WAL-mode database; it
+    can wait on the file lock, so the middleware runs it in the threadpool.
+    """
+
+    blocking = True
+
+    def __init__(self):
+        self._path = str(settings.RATE_LIMIT_SQLITE_PATH)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=1, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, capacity: int, rate: float) -> Tuple[bool, float, float]:
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = capacity if row is None else refill(row[0], row[1], capacity, rate, now)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            conn.execute(
+                "INSERT INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                (key, tokens, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, tokens, 0.0 if allowed else (1 - tokens) / rate
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.RATE_LIMIT_BACKEND)()
+    return _backend
+
+
+def limit_for(route_key: Optional[str]) -> Optional[str]:
+    if route_key is not None and route_key in settings.RATE_LIMITS:
+        return settings.RATE_LIMITS[route_key]
+    return settings.RATE_LIMIT_DEFAULT
+
+
+class RateLimitMiddleware:
+    """ASGI middleware answering 429 with Retry-After once a bucket is empty"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        route, _ = match_route(scope)
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+        route_key = f"{scope['method']} {route.path}"
+        rate = limit_for(route_key)
+        if not rate:
+            await self.app(scope, receive, send)
+            return
+
+        # Identity only needs the signature; revoked tokens are rejected later anyway
+        claims = peek_token(scope, verify_version=False)
+        if claims is not None:
+            subject = f"user:{claims['user_id']}"
+        else:
+            subject = f"ip:{scope['client'][0] if scope.get('client') else 'unknown'}"
+
+        capacity, refill_rate = parse_rate(rate)
+        backend = get_backend()
+        try:
+            if backend.blocking:
+                allowed, remaining, retry_after = await anyio.to_thread.run_sync(
+                    backend.take, f"{subject}|{route_key}", capacity, refill_rate)
+            else:
+                allowed, remaining, retry_after = backend.take(f"{subject}|{route_key}", capacity, refill_rate)
+        except Exception:
+            # A broken bucket store must not take the API down with it: let the request through
+            logger.exception("Rate limiter store failed; not limiting %s", route_key)
+            await self.app(scope, receive, send)
+            return
+        limit_headers = [
+            (b"x-ratelimit-limit", str(capacity).encode()),
+            (b"x-ratelimit-remaining", str(int(remaining)).encode()),
+        ]
+
+        if not allowed:
+            scope["route"] = route  # so metrics label the 429 with the route
+            body = json.dumps({"detail": "Rate limit exceeded"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(math.ceil(retry_after)).encode()),
+                ] + limit_headers,
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + limit_headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,145 @@
+"""
+Retention policies for the history of closed deals (stage in COMPACT_STAGES).
+
+- Memo versions: once a deal hasn't changed for MEMO_RETENTION_DAYS, only its
+  newest MEMO_KEEP_VERSIONS versions and its milestone versions are kept.
+- Activities older than ACTIVITY_ROLLUP_AFTER_DAYS are folded into one
+  ActivityRollup per deal and day.
+
+Work is split into transactions of at most COMPACT_BATCH_SIZE rows with a
+COMPACT_PAUSE between them, so the SQLite write lock is only ever held
+briefly and API writes interleave with a running compaction. Rows already
+in cold storage (core.archive) are left alone.
+"""
+import time
+from collections import defaultdict
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+
+def database_bytes(alias: str = "default") -> Optional[int]:
+    """Bytes of the database in use (SQLite: pages not on the freelist); None if unknown"""
+    connection = connections[alias]
+    if connection.vendor != "sqlite":
+        return None
+    with connection.cursor() as cursor:
+        values = []
+        for pragma in ("page_size", "page_count", "freelist_count"):
+            cursor.execute(f"PRAGMA {pragma}")
+            values.append(cursor.fetchone()[0])
+    page_size, page_count, freelist_count = values
+    return page_size * (page_count - freelist_count)
+
+
+def compact_memos(batch_size: Optional[int] = None, pause: Optional[float] = None) -> int:
+    """Delete memo versions past retention; returns versions deleted"""
+    from core.cache import deal_tag, response_cache
+    from models.models import Deal, ICMemo
+
+    batch_size = batch_size or settings.COMPACT_BATCH_SIZE
+    pause = settings.COMPACT_PAUSE if pause is None else pause
+    keep = max(1, settings.MEMO_KEEP_VERSIONS)
+    cutoff = timezone.now() - timedelta(days=settings.MEMO_RETENTION_DAYS)
+    deals = (
+        Deal.objects.filter(stage__in=settings.COMPACT_STAGES, updated_at__lt=cutoff)
+        .annotate(memo_count=Count('ic_memos'))
+        .filter(memo_count__gt=keep)
+        .order_by('id')
+        .values_list('id', flat=True)
+    )
+
+    deleted, last_id = 0, 0
+    while True:
+        deal_ids = list(deals.filter(id__gt=last_id)[:batch_size])
+        if not deal_ids:
+            return deleted
+        last_id = deal_ids[-1]
+
+        seen = defaultdict(int)
+        doomed = []
+        memos = (
+            ICMemo.objects.filter(deal_id__in=deal_ids)
+            .order_by('deal_id', '-version')
+            .values_list('id', 'deal_id', 'is_milestone')
+        )
+        for memo_id, deal_id, is_milestone in memos:
+            seen[deal_id] += 1
+            if seen[deal_id] > keep and not is_milestone:
+                doomed.append((memo_id, deal_id))
+
+        # New versions only ever go on top, so the ones picked here stay outside the newest `keep`
+        for start in range(0, len(doomed), batch_size):
+            chunk = doomed[start:start + batch_size]
+            with transaction.atomic():
+                ICMemo.objects.filter(id__in=[memo_id for memo_id, _ in chunk]).delete()
+            # Cached memo lists of these deals still show the deleted versions
+            response_cache.invalidate(*{deal_tag(deal_id) for _, deal_id in chunk})
+            deleted += len(chunk)
+            time.sleep(pause)
+
+
+def _verb(action: str) -> str:
+    """'moved 'X' from A to B' -> 'moved'"""
+    return action.split(' ', 1)[0].lower() if action else ''
+
+
+def rollup_activities(batch_size: Optional[int] = None, pause: Optional[float] = None) -> int:
+    """Fold activities past retention into daily rollups; returns activities rolled up"""
+    from models.models import Activity, ActivityRollup
+
+    batch_size = batch_size or settings.COMPACT_BATCH_SIZE
+    pause = settings.COMPACT_PAUSE if pause is None else pause
+    cutoff = timezone.now() - timedelta(days=settings.ACTIVITY_ROLLUP_AFTER_DAYS)
+    old = Activity.objects.filter(deal__stage__in=settings.COMPACT_STAGES, created_at__lt=cutoff)
+
+    rolled = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                old.order_by('id').values('id', 'deal_id', 'user_id', 'action', 'created_at')[:batch_size]
+            )
+            if not rows:
+                return rolled
+
+            days = defaultdict(list)
+            for row in rows:
+                days[(row['deal_id'], row['created_at'].date())].append(row)
+            existing = {
+                (rollup.deal_id, rollup.day): rollup
+                for rollup in ActivityRollup.objects.filter(
+                    deal_id__in={deal_id for deal_id, _ in days},
+                    day__in={day for _, day in days},
+                )
+            }
+
+            created, changed = [], []
+            for (deal_id, day), entries in days.items():
+                rollup = existing.get((deal_id, day))
+                if rollup is None:
+                    rollup = ActivityRollup(
+                        deal_id=deal_id, day=day,
+                        first_at=entries[0]['created_at'], last_at=entries[0]['created_at'],
+                    )
+                    created.append(rollup)
+                else:
+                    changed.append(rollup)
+                for entry in entries:
+                    rollup.count += 1
+                    user_key = str(entry['user_id'])
+                    rollup.users[user_key] = rollup.users.get(user_key, 0) + 1
+                    verb = _verb(entry['action'])
+                    rollup.actions[verb] = rollup.actions.get(verb, 0) + 1
+                    rollup.first_at = min(rollup.first_at, entry['created_at'])
+                    rollup.last_at = max(rollup.last_at, entry['created_at'])
+
+            ActivityRollup.objects.bulk_create(created)
+            ActivityRollup.objects.bulk_update(changed, ['count', 'users', 'actions', 'first_at', 'last_at'])
+            Activity.objects.filter(id__in=[row['id'] for row in rows]).delete()
+
+        rolled += len(rows)
+        time.sleep(pause)
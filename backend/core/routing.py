@@ -0,0 +1,31 @@
+"""Route lookup for middleware that must know the route before dispatch"""
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from starlette.routing import Match
+
+
+def match_route(scope) -> Tuple[Optional[object], dict]:
+    """
+    The app route matching an HTTP scope and its path params, or (None, {}).
+    Starlette only resolves this inside the router, after middleware has run.
+    """
+    return _match(scope["app"], scope["method"], scope["path"])
+
+
+@lru_cache(maxsize=4096)
+def _match(app, method: str, path: str):
+    probe = {"type": "http", "method": method, "path": path, "root_path": ""}
+    for route in app.router.routes:
+        match, child_scope = route.matches(probe)
+        if match == Match.FULL:
+            return route, child_scope.get("path_params", {})
+    return None, {}
+
+
+def route_key(scope) -> Optional[str]:
+    """'METHOD /path/{template}' for the matched route, e.g. 'GET /api/deals/{deal_id}'"""
+    route, _ = match_route(scope)
+    if route is None:
+        return None
+    return f"{scope['method']} {route.path}"
@@ -1,7 +1,7 @@
 """Pydantic schemas for API request/response validation"""
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
-from datetime import datetime
+from typing import Dict, Optional, List
+from datetime import date, datetime
 from decimal import Decimal
 
 
@@ -13,10 +13,19 @@ class LoginRequest(BaseModel):
 
 class TokenResponse(BaseModel):
     access_token: str
+    refresh_token: Optional[str] = None
     token_type: str = "bearer"
     user: 'UserResponse'
 
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
+
 class RegisterRequest(BaseModel):
     email: EmailStr
     username: str
@@ -79,10 +88,12 @@ class DealUpdate(BaseModel):
     company_url: Optional[str] = None
     round: Optional[str] = None
     check_size: Optional[Decimal] = None
+    version: Optional[int] = None  # expected current version (alternative to If-Match)
 
 
 class DealStageUpdate(BaseModel):
     stage: str
+    version: Optional[int] = None  # expected current version (alternative to If-Match)
 
 
 class DealResponse(BaseModel):
@@ -94,6 +105,7 @@ class DealResponse(BaseModel):
     round: Optional[str] = None
     check_size: Optional[Decimal] = None
     status: str
+    version: int
     created_at: datetime
     updated_at: datetime
     
@@ -113,6 +125,8 @@ class ICMemoSections(BaseModel):
 
 class ICMemoCreate(BaseModel):
     sections: ICMemoSections
+    base_version: Optional[int] = None  # memo version the edit started from (409 if stale)
+    is_milestone: bool = False  # kept forever by history compaction
 
 
 class ICMemoResponse(BaseModel):
@@ -120,6 +134,7 @@ class ICMemoResponse(BaseModel):
     deal_id: int
     version: int
     sections: dict
+    is_milestone: bool = False
     created_by: UserResponse
     created_at: datetime
     
@@ -139,6 +154,19 @@ class ActivityResponse(BaseModel):
         from_attributes = True
 
 
+class ActivityRollupResponse(BaseModel):
+    deal_id: int
+    day: date
+    count: int
+    users: Dict[str, int]
+    actions: Dict[str, int]
+    first_at: datetime
+    last_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
 # Comment Schemas
 class CommentCreate(BaseModel):
     content: str
@@ -174,6 +202,103 @@ class VoteResponse(BaseModel):
         from_attributes = True
 
 
+# Compact list schemas
+# Rows reference users by id; each referenced user appears once in `users`.
+# Served by list endpoints when called with ?compact=true.
+class UserSummary(BaseModel):
+    id: int
+    email: str
+    username: str
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    role_name: Optional[str] = None
+
+
+class DealSummary(BaseModel):
+    id: int
+    name: str
+    company_url: Optional[str] = None
+    owner_id: int
+    stage: str
+    round: Optional[str] = None
+    check_size: Optional[Decimal] = None
+    status: str
+    version: int
+    created_at: datetime
+    updated_at: datetime
+
+
+class ActivitySummary(BaseModel):
+    id: int
+    deal_id: int
+    user_id: int
+    action: str
+    created_at: datetime
+
+
+class CommentSummary(BaseModel):
+    id: int
+    deal_id: int
+    user_id: int
+    content: str
+    created_at: datetime
+    updated_at: datetime
+
+
+class VoteSummary(BaseModel):
+    id: int
+    deal_id: int
+    user_id: int
+    vote: str
+    comment: Optional[str] = None
+    created_at: datetime
+
+
+class ICMemoSummary(BaseModel):
+    id: int
+    deal_id: int
+    version: int
+    sections: dict
+    is_milestone: bool
+    created_by_id: int
+    created_at: datetime
+
+
+class CompactListResponse(BaseModel):
+    items: List[dict]
+    users: List[UserSummary]
+
+
+# IC decision
+class DecisionResponse(BaseModel):
+    deal_id: int
+    outcome: str  # 'pending', 'approved' or 'declined'
+    approve_count: int
+    decline_count: int
+    approve_weight: int
+    decline_weight: int
+    quorum: int
+    approve_threshold: float
+    decided_at: Optional[datetime] = None
+
+
+# Inbox Schemas
+class InboxItem(BaseModel):
+    deal: DealSummary
+    reason: str  # 'owner', 'comment' or 'vote'
+    unread_count: int
+    last_activity_at: datetime
+    last_seen_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class InboxResponse(BaseModel):
+    unread_total: int
+    items: List[InboxItem]
+
+
 # Update forward references
 TokenResponse.model_rebuild()
 
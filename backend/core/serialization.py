@@ -0,0 +1,68 @@
+"""
+Fast JSON serialization for list endpoints.
+
+FastAPI normally validates whatever a handler returns against response_model
+a second time and encodes it with the stdlib json module. These helpers
+validate ORM rows once, dump them with pydantic-core and encode with orjson,
+returning a Response so FastAPI skips its own pass.
+"""
+from decimal import Decimal
+from functools import lru_cache
+from typing import Iterable, List, Type, Union
+
+import orjson
+from django.db.models import F, QuerySet
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+from core.schemas import UserSummary
+
+
+def _default(value):
+    # Pydantic's JSON mode renders Decimal as a string; keep the wire format identical
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(ORJSONResponse):
+    """ORJSONResponse that matches Pydantic's JSON output (Decimal as str, UTC as 'Z')"""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z)
+
+
+@lru_cache(maxsize=None)
+def list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+
+def list_response(schema: Type[BaseModel], objects: Iterable) -> FastJSONResponse:
+    """Validate ORM objects against `schema` once and encode with orjson"""
+    adapter = list_adapter(schema)
+    return FastJSONResponse(adapter.dump_python(adapter.validate_python(list(objects), from_attributes=True)))
+
+
+def compact_response(
+    queryset: Union[QuerySet, List], schema: Type[BaseModel], user_field: str
+) -> FastJSONResponse:
+    """
+    Compact list: rows shaped like `schema` (read straight from .values(), no
+    model instances) that reference users by id, plus a `users` side-table
+    with every referenced user exactly once. Also takes a list of instances
+    (core.archive.with_archived).
+    """
+    from models.models import User
+
+    if isinstance(queryset, QuerySet):
+        rows = list(queryset.values(*schema.model_fields))
+    else:
+        rows = [{name: getattr(obj, name) for name in schema.model_fields} for obj in queryset]
+    user_ids = {row[user_field] for row in rows}
+    user_fields = [name for name in UserSummary.model_fields if name != 'role_name']
+    users = list(
+        User.objects.filter(id__in=user_ids)
+        .order_by()
+        .values(*user_fields, role_name=F('role__name'))
+    )
+    return FastJSONResponse({"items": rows, "users": users})
@@ -65,6 +65,74 @@ DATABASES = {
     }
 }
 
+# Read replica for @replica_read handlers (core.db_router). Locally a second
+# SQLite file stands in for it; refresh it with `manage.py sync_replica`.
+READ_REPLICA_ENABLED = os.environ.get('READ_REPLICA_ENABLED', 'false').lower() == 'true'
+if READ_REPLICA_ENABLED:
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('REPLICA_DB_NAME', BASE_DIR / 'db.replica.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+REPLICA_STICKY_SECONDS = 5  # reads stay on the primary this long after a user writes
+REPLICA_STICKY_CACHE = 'default'  # use a shared cache alias with several workers
+
+# Cold storage for archived deals' child rows (core.archive, `manage.py archive_deals`).
+# By default ArchivedRecord lives in the main database; ARCHIVE_DB_NAME moves it to
+# its own SQLite file (create it with `manage.py migrate --database archive`).
+ARCHIVE_DB_NAME = os.environ.get('ARCHIVE_DB_NAME')
+if ARCHIVE_DB_NAME:
+    DATABASES['archive'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ARCHIVE_DB_NAME,
+    }
+    DATABASE_ROUTERS = ['core.db_router.ArchiveRouter', *globals().get('DATABASE_ROUTERS', [])]
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 30))  # since the deal was archived
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 1000))  # rows moved per statement
+
+# Most deals one GET /api/deals?ids=... may ask for
+DEALS_BATCH_MAX_IDS = int(os.environ.get('DEALS_BATCH_MAX_IDS', 100))
+
+# Deal stage workflow (core.workflow). `transitions` lists the stages a deal may move to
+# from each stage ('*': from any stage); `guards` and `hooks` apply to moves into a stage.
+DEAL_WORKFLOW = {
+    'transitions': {
+        'Sourced': ['Screen'],
+        'Screen': ['Sourced', 'Diligence'],
+        'Diligence': ['Screen', 'IC'],
+        'IC': ['Diligence', 'Invested'],
+        'Passed': ['Sourced'],
+        '*': ['Passed'],
+    },
+    'guards': {
+        'IC': ['has_memo'],
+        'Invested': ['ic_approved'],
+    },
+    'hooks': {
+        'IC': ['core.workflow.mark_memo_milestone'],
+    },
+}
+
+# IC decisions (core.decisions): vote weights by role name or hierarchy_level (default 1),
+# votes needed before deciding (also the approving votes the 'quorum_votes' stage guard
+# asks for), and the share of weight that must approve (strictly above)
+IC_DECISION = {
+    'weights': {'Admin': 1, 'Partner': 1},
+    'quorum': int(os.environ.get('IC_QUORUM', 2)),
+    'approve_threshold': float(os.environ.get('IC_APPROVE_THRESHOLD', 0.5)),
+    # Move decided deals from IC to Invested / Passed
+    'auto_advance': os.environ.get('IC_AUTO_ADVANCE', 'false').lower() == 'true',
+}
+
+# History compaction for closed deals (core.retention, `manage.py compact_history`)
+COMPACT_STAGES = ['Invested', 'Passed']
+MEMO_KEEP_VERSIONS = int(os.environ.get('MEMO_KEEP_VERSIONS', 3))  # newest versions kept, plus milestones
+MEMO_RETENTION_DAYS = int(os.environ.get('MEMO_RETENTION_DAYS', 30))  # since the deal last changed
+ACTIVITY_ROLLUP_AFTER_DAYS = int(os.environ.get('ACTIVITY_ROLLUP_AFTER_DAYS', 90))  # then one rollup per day
+COMPACT_BATCH_SIZE = int(os.environ.get('COMPACT_BATCH_SIZE', 500))  # rows per transaction
+COMPACT_PAUSE = float(os.environ.get('COMPACT_PAUSE', 0.05))  # seconds between transactions
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -112,5 +180,109 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # JWT Settings
 JWT_SECRET_KEY = "your-secret-key-change-in-production"
 JWT_ALGORITHM = "HS256"
-JWT_ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
+JWT_ACCESS_TOKEN_EXPIRE_MINUTES = 15
+JWT_REFRESH_TOKEN_EXPIRE_DAYS = 7  # refresh tokens rotate on every use
+# A rotated refresh token replayed this soon is a concurrent refresh (another tab), not a leak
+REFRESH_REUSE_GRACE_SECONDS = 10
+# Revoked token ids are mirrored in memory; sync new revocations / drop expired ones
+REVOCATION_SYNC_SECONDS = 5
+REVOCATION_COMPACT_SECONDS = 60 * 60
+# Embed role and permissions in access tokens and authenticate without a DB query
+JWT_STATELESS_AUTH = os.environ.get('JWT_STATELESS_AUTH', 'false').lower() == 'true'
+# How stale the in-memory token version table may get (bounds role-change propagation)
+TOKEN_VERSION_CACHE_SECONDS = 30
+# Compiled role permissions are reloaded at least this often (seconds)
+PERMISSION_REGISTRY_TTL = 60
+
+# Query instrumentation
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 100))
+
+# Metrics: with multiple workers, point this at a shared directory so /metrics
+# aggregates every worker's counters
+METRICS_MULTIPROC_DIR = os.environ.get('METRICS_MULTIPROC_DIR', '')
+METRICS_FLUSH_INTERVAL = 5  # seconds between per-worker snapshot writes
+
+# Health checks
+HEALTH_CHECK_CACHE_SECONDS = 2  # reuse readiness results between probes
+HEALTH_CHECK_DB_TIMEOUT = 2  # seconds before the DB check counts as failed
+HEALTH_MAX_THREADPOOL_QUEUE = 50  # queued sync handlers before reporting unready
+
+# Worker warmup
+WARMUP_DB_CONNECTIONS = 4  # DB connections to open before reporting ready
+WARMUP_TIMEOUT = 10  # seconds
+
+# Production server (serve.py)
+SERVER_WORKERS = int(os.environ.get('WEB_CONCURRENCY', 0))  # 0 = one per CPU
+# Sync handlers run in the AnyIO threadpool, one DB connection per thread
+SERVER_THREADPOOL_SIZE = int(os.environ.get('THREADPOOL_SIZE', 40))
+DB_MAX_CONNECTIONS_PER_WORKER = int(os.environ.get('DB_MAX_CONNECTIONS_PER_WORKER', 0))  # 0 = no cap
+SERVER_BACKLOG = 2048
+SERVER_KEEP_ALIVE = 75  # seconds; keep above the proxy's upstream idle timeout
+SERVER_GRACEFUL_SHUTDOWN = 30  # seconds to drain in-flight requests on SIGTERM
+SERVER_LIMIT_CONCURRENCY = int(os.environ.get('SERVER_LIMIT_CONCURRENCY', 0))  # 0 = unlimited
+SERVER_MAX_REQUESTS = int(os.environ.get('SERVER_MAX_REQUESTS', 0))  # recycle workers; 0 = never
+SERVER_ACCESS_LOG = os.environ.get('SERVER_ACCESS_LOG', 'false').lower() == 'true'
+# Proxies whose X-Forwarded-For is trusted for the client address (rate limits key on it);
+# comma-separated IPs, or '*' only when nothing but the proxy can reach the workers
+FORWARDED_ALLOW_IPS = os.environ.get('FORWARDED_ALLOW_IPS', '127.0.0.1')
+
+# Response compression
+COMPRESSION_MIN_SIZE = 1024  # bytes; smaller bodies are sent as-is
+COMPRESSION_CACHE_BYTES = 32 * 1024 * 1024  # compressed bodies kept for reuse
+
+# Rate limiting (token buckets per user, or per IP when unauthenticated, per route)
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+# core.ratelimit.MemoryBackend is per worker; SQLiteBackend shares buckets across workers
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'core.ratelimit.MemoryBackend')
+RATE_LIMIT_SQLITE_PATH = os.environ.get('RATE_LIMIT_SQLITE_PATH', '/tmp/ratelimit.sqlite3')
+RATE_LIMIT_DEFAULT = os.environ.get('RATE_LIMIT_DEFAULT', '600/minute')  # '' = unlimited
+RATE_LIMITS = {  # "METHOD /route/template": "N/second|minute|hour|day"
+    'POST /api/auth/login': '10/minute',
+    'POST /api/auth/refresh': '30/minute',
+    'GET /api/deals/{deal_id}/vote/summary': '60/minute',
+}
+
+# Single-flight: identical concurrent GETs on these routes share one endpoint call.
+# The value says who may share a response: 'authenticated', 'role' or 'user'.
+COALESCE_ROUTES = {
+    'GET /api/deals': 'authenticated',
+    'GET /api/deals/{deal_id}': 'authenticated',
+    'GET /api/deals/{deal_id}/votes': 'authenticated',
+    'GET /api/deals/{deal_id}/vote/summary': 'authenticated',
+    'GET /api/deals/{deal_id}/comments': 'authenticated',
+    'GET /api/deals/{deal_id}/memos': 'authenticated',
+    'GET /api/deals/{deal_id}/memos/latest': 'authenticated',
+    'GET /api/deals/{deal_id}/activities': 'authenticated',
+}
+
+# Response cache for deal reads (core.cache); invalidated by the write handlers
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+# DjangoCacheBackend shares entries (and invalidations) across workers through CACHES;
+# core.cache.MemoryBackend is per process, only for a single worker
+RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'core.cache.DjangoCacheBackend')
+RESPONSE_CACHE_ALIAS = 'responses'
+# MemoryBackend's total size; with either backend no entry may exceed a quarter of it
+RESPONSE_CACHE_BYTES = int(os.environ.get('RESPONSE_CACHE_BYTES', 64 * 1024 * 1024))
+RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 30))  # seconds
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Shared by all workers on the host; point at memcached with
+    # RESPONSE_CACHE_DJANGO_BACKEND=django.core.cache.backends.memcached.PyMemcacheCache
+    'responses': {
+        'BACKEND': os.environ.get(
+            'RESPONSE_CACHE_DJANGO_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('RESPONSE_CACHE_LOCATION', '/tmp/response-cache'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
 
+# Background jobs (core.jobs): activity logging and other side effects
+JOBS_SYNC = os.environ.get('JOBS_SYNC', 'false').lower() == 'true'  # run jobs inline (tests)
+JOBS_DURABLE = os.environ.get('JOBS_DURABLE', 'false').lower() == 'true'  # OutboxJob table, at-least-once
+JOBS_FLUSH_INTERVAL = 0.05  # seconds between batch flushes
+JOBS_LEASE_SECONDS = 30  # outbox rows not done by then are run again by some worker
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RECOVER_BATCH = 500
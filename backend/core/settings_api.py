@@ -0,0 +1,21 @@
+"""
+API-only settings profile used by the FastAPI process.
+
+The API never serves Django views, templates, sessions or static files, so
+only the apps the ORM models depend on are loaded. This keeps django.setup()
+(and therefore worker cold start) cheap. manage.py and the admin keep using
+core.settings.
+"""
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    'django.contrib.auth',  # AbstractUser, permissions
+    'django.contrib.contenttypes',  # required by django.contrib.auth
+    'models',
+]
+
+MIDDLEWARE = []
+
+ROOT_URLCONF = None  # core.urls only serves the admin
+
+TEMPLATES = []
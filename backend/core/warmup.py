@@ -0,0 +1,48 @@
+"""Worker warmup run before the worker reports ready"""
+import threading
+
+from django.conf import settings
+from django.db import connection
+from pydantic import BaseModel
+
+from core import schemas
+
+
+def build_schemas(app):
+    """
+    Build everything Pydantic and FastAPI otherwise compile on first use:
+    the JSON schema of every model in core.schemas and the OpenAPI document.
+    """
+    for value in vars(schemas).values():
+        if isinstance(value, type) and issubclass(value, BaseModel) and value is not BaseModel:
+            value.model_json_schema()
+    app.openapi()
+
+
+def open_db_connection(barrier: threading.Barrier):
+    """
+    Open this thread's DB connection, then wait for the other warmup tasks.
+    Django connections are per thread, so the barrier forces the warmup tasks
+    onto distinct threadpool threads instead of reusing one.
+    """
+    connection.ensure_connection()
+    try:
+        barrier.wait(timeout=settings.WARMUP_TIMEOUT)
+    except threading.BrokenBarrierError:
+        pass
+
+
+async def warm_up(app):
+    """Compile schemas and pre-open WARMUP_DB_CONNECTIONS database connections"""
+    import anyio
+    from fastapi.concurrency import run_in_threadpool
+
+    await run_in_threadpool(build_schemas, app)
+
+    # Never wait on more threads than the pool can run at once
+    count = min(settings.WARMUP_DB_CONNECTIONS, anyio.to_thread.current_default_thread_limiter().total_tokens)
+    if count > 0:
+        barrier = threading.Barrier(count)
+        async with anyio.create_task_group() as tg:
+            for _ in range(count):
+                tg.start_soon(run_in_threadpool, open_db_connection, barrier)
@@ -0,0 +1,147 @@
+"""
+Deal stage workflow.
+
+DEAL_WORKFLOW says which stage moves are allowed, which guards a move into
+a stage has to pass and which hooks run after it. It is compiled once per
+process into an adjacency map (stage -> frozenset of next stages), so
+checking a move is a dict lookup.
+
+Guards are evaluated by the query that loads the deal: each contributes an
+annotation (an EXISTS or scalar subquery) and a check on the annotated value,
+so a stage move costs the same number of queries whichever guards apply.
+Hooks run after the move is saved; they receive (deal, old_stage, user).
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.module_loading import import_string
+
+ANY = "*"
+
+
+@dataclass(frozen=True)
+class Guard:
+    name: str
+    expression: Callable[[], Any]  # annotation on the deal row (built lazily: models import late)
+    check: Callable[[Any], bool]  # passes given the annotated value
+    message: str  # formatted with `stage` and `settings`
+
+    @property
+    def attname(self) -> str:
+        return f"guard_{self.name}"
+
+
+_guards: Dict[str, Guard] = {}
+
+
+def register_guard(guard: Guard) -> Guard:
+    _guards[guard.name] = guard
+    return guard
+
+
+def _has_memo():
+    from models.models import ICMemo
+
+    return Exists(ICMemo.objects.filter(deal=OuterRef('pk')))
+
+
+def _approvals():
+    from models.models import DealDecision
+
+    # Running counter kept by core.decisions, not a count over the votes
+    approvals = DealDecision.objects.filter(deal=OuterRef('pk')).values('approve_count')
+    return Coalesce(Subquery(approvals), 0)
+
+
+def _ic_approved():
+    from models.models import DealDecision
+
+    return Exists(DealDecision.objects.filter(deal=OuterRef('pk'), outcome=DealDecision.APPROVED))
+
+
+register_guard(Guard(
+    "has_memo", _has_memo, bool,
+    "Moving a deal to {stage} requires an IC memo",
+))
+register_guard(Guard(
+    "ic_approved", _ic_approved, bool,
+    "Moving a deal to {stage} requires an approving IC decision",
+))
+register_guard(Guard(
+    "quorum_votes", _approvals, lambda approvals: approvals >= settings.IC_DECISION['quorum'],
+    "Moving a deal to {stage} requires {settings.IC_DECISION[quorum]} approving votes",
+))
+
+
+# Hooks
+
+def mark_memo_milestone(deal, old_stage: str, user):
+    """Keep the memo version the committee reviews (the latest one) through compaction"""
+    from models.models import ICMemo
+
+    latest = ICMemo.objects.filter(deal_id=deal.id).order_by('-version').values('version')[:1]
+    ICMemo.objects.filter(deal_id=deal.id, version=Subquery(latest)).update(is_milestone=True)
+
+
+class Workflow:
+    """DEAL_WORKFLOW compiled into lookup tables"""
+
+    def __init__(self, config: dict, stages: Tuple[str, ...]):
+        self.stages = stages
+        transitions = config.get('transitions', {})
+        self._check_stages(transitions.keys() - {ANY}, "transitions")
+        from_any = frozenset(transitions.get(ANY, ()))
+        self.next: Dict[str, FrozenSet[str]] = {
+            stage: (frozenset(transitions.get(stage, ())) | from_any) - {stage}
+            for stage in stages
+        }
+        for targets in self.next.values():
+            self._check_stages(targets, "transitions")
+
+        self.guards: Dict[str, Tuple[Guard, ...]] = {}
+        for stage, names in config.get('guards', {}).items():
+            self._check_stages([stage], "guards")
+            unknown = set(names) - _guards.keys()
+            if unknown:
+                raise ImproperlyConfigured(f"DEAL_WORKFLOW: unknown guards {sorted(unknown)}")
+            self.guards[stage] = tuple(_guards[name] for name in names)
+
+        self.hooks: Dict[str, Tuple[Callable, ...]] = {}
+        for stage, paths in config.get('hooks', {}).items():
+            self._check_stages([stage], "hooks")
+            self.hooks[stage] = tuple(import_string(path) for path in paths)
+
+    def _check_stages(self, names, section: str):
+        unknown = set(names) - set(self.stages)
+        if unknown:
+            raise ImproperlyConfigured(f"DEAL_WORKFLOW {section}: unknown stages {sorted(unknown)}")
+
+    def allowed(self, from_stage: str, to_stage: str) -> bool:
+        return to_stage in self.next.get(from_stage, ())
+
+    def annotations(self, to_stage: str) -> Dict[str, Any]:
+        """Annotations to load the deal with so guards for `to_stage` can be checked"""
+        return {guard.attname: guard.expression() for guard in self.guards.get(to_stage, ())}
+
+    def failed_guard(self, deal, to_stage: str) -> Optional[str]:
+        """Message of the first guard the annotated deal fails, None if it passes them all"""
+        for guard in self.guards.get(to_stage, ()):
+            if not guard.check(getattr(deal, guard.attname)):
+                return guard.message.format(stage=to_stage, settings=settings)
+        return None
+
+    def run_hooks(self, deal, old_stage: str, user):
+        for hook in self.hooks.get(deal.stage, ()):
+            hook(deal, old_stage, user)
+
+
+@lru_cache(maxsize=None)
+def get_workflow() -> Workflow:
+    from models.models import Deal
+
+    return Workflow(settings.DEAL_WORKFLOW, tuple(stage for stage, _ in Deal.STAGE_CHOICES))
@@ -1,21 +1,39 @@
 """
 FastAPI main application with Django ORM integration
 """
+import asyncio
+import logging
 import sys
 from pathlib import Path
 
 # Add backend to Python path
 sys.path.insert(0, str(Path(__file__).parent))
 
+from django.conf import settings
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from core.database import setup_django
 
-# Setup Django
-setup_django()
+logger = logging.getLogger(__name__)
+
+# Setup Django with the API-only app list (before any module that reads settings at import)
+setup_django('core.settings_api')
+
+from core.instrumentation import QueryCountMiddleware, enable_query_instrumentation
+from core import health, metrics, warmup
+from core.jobs import job_queue
+from core.compression import CompressionMiddleware
+from core.ratelimit import RateLimitMiddleware
+from core.coalescing import CoalescingMiddleware
+from core.db_router import ReplicaStickinessMiddleware
+from core.loader import LoaderMiddleware
+
+enable_query_instrumentation()
 
 # Import routers (will be created next)
-from api import auth, deals, memos, interactions, users
+from api import auth, deals, memos, interactions, users, me
 
 # Create FastAPI app
 app = FastAPI(
@@ -24,6 +42,18 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Per-request batched lookups (core.loader)
+app.add_middleware(LoaderMiddleware)
+
+# Pins users to the primary database for a while after they write
+app.add_middleware(ReplicaStickinessMiddleware)
+
+# Identical concurrent reads share one endpoint call (innermost)
+app.add_middleware(CoalescingMiddleware)
+
+# Per-user / per-IP token buckets (inside CORS so 429s carry CORS headers)
+app.add_middleware(RateLimitMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -33,12 +63,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request counts, latency histograms and in-flight gauge for /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Per-request SQL query count and DB time (Server-Timing header)
+app.add_middleware(QueryCountMiddleware)
+
+# gzip/brotli/zstd compression of large responses (outermost)
+app.add_middleware(CompressionMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(deals.router, prefix="/api/deals", tags=["Deals"])
 app.include_router(memos.router, prefix="/api/deals", tags=["IC Memos"])
 app.include_router(interactions.router, prefix="/api/deals", tags=["Interactions"])
 app.include_router(users.router, prefix="/api/users", tags=["Users"])
+app.include_router(me.router, prefix="/api/me", tags=["Me"])
 
 
 @app.get("/")
@@ -50,7 +90,61 @@ def root():
     }
 
 
+async def warm_up():
+    """Prepare the worker in the background, then start reporting ready"""
+    try:
+        await warmup.warm_up(app)
+    except Exception:
+        # A cold worker is still a working one; the readiness check reports the DB state
+        logger.exception("Worker warmup failed")
+    await run_in_threadpool(health.check_database)
+    health.mark_ready()
+
+
+def configure_threadpool():
+    """
+    Size the AnyIO threadpool that runs sync handlers. Each thread holds its own
+    Django DB connection, so the pool is also the per-worker connection limit.
+    """
+    from anyio import to_thread
+
+    size = settings.SERVER_THREADPOOL_SIZE
+    if settings.DB_MAX_CONNECTIONS_PER_WORKER:
+        size = min(size, settings.DB_MAX_CONNECTIONS_PER_WORKER)
+    to_thread.current_default_thread_limiter().total_tokens = size
+
+
+@app.on_event("startup")
+async def start_warm_up():
+    configure_threadpool()
+    job_queue.start()
+    # Keep a reference so the task isn't garbage collected mid-flight
+    app.state.warm_up_task = asyncio.create_task(warm_up())
+
+
+@app.on_event("shutdown")
+async def stop_serving():
+    health.mark_unready()
+    await job_queue.stop()  # flush queued activity writes before exiting
+
+
 @app.get("/health")
-def health_check():
+@app.get("/health/live")
+async def health_check():
+    """Liveness: the process is up and the event loop is responsive"""
     return {"status": "healthy"}
 
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: warmed up, database reachable and migrated, threadpool not backed up"""
+    report = await health.readiness_report()
+    status_code = 200 if report["status"] == "ready" else 503
+    return JSONResponse(report, status_code=status_code)
+
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics_endpoint():
+    """Prometheus scrape endpoint (async so threadpool stats are read on the event loop)"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
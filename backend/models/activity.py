@@ -27,6 +27,8 @@ class Activity(models.Model):
         verbose_name = "Activity"
         verbose_name_plural = "Activities"
         ordering = ['-created_at']
+        # A deal's activities, newest first, straight from the index
+        indexes = [models.Index(fields=['deal', '-created_at'], name='activity_deal_created_idx')]
         app_label = 'models'
 
     def __str__(self):
@@ -10,4 +10,5 @@ class ModelsConfig(AppConfig):
     def ready(self):
         """Import models when app is ready"""
         from . import models  # noqa
+        from . import signals  # noqa
 
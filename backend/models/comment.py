@@ -26,6 +26,8 @@ class Comment(models.Model):
         verbose_name = "Comment"
         verbose_name_plural = "Comments"
         ordering = ['-created_at']
+        # A deal's comments, newest first, straight from the index
+        indexes = [models.Index(fields=['deal', '-created_at'], name='comment_deal_created_idx')]
         app_label = 'models'
 
     def __str__(self):
@@ -3,6 +3,13 @@ from django.db import models
 from django.utils import timezone
 
 
+class ActiveDealManager(models.Manager):
+    """Deals still in the pipeline (status 'active'); what the API reads by default"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(status='active')
+
+
 class Deal(models.Model):
     """
     Deal model representing an investment opportunity in the pipeline
@@ -45,15 +52,43 @@ class Deal(models.Model):
         choices=STATUS_CHOICES,
         default='active'
     )
+    # Incremented by every edit; clients send it back (If-Match) to detect conflicting edits
+    version = models.PositiveIntegerField(default=1)
+    # Set once archive_deals has moved (some of) the deal's child rows to ArchivedRecord
+    in_cold_storage = models.BooleanField(default=False)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = models.Manager()
+    active = ActiveDealManager()
+
     class Meta:
         verbose_name = "Deal"
         verbose_name_plural = "Deals"
         ordering = ['-created_at']
+        # Partial indexes: they only hold the active pipeline however many deals are archived
+        indexes = [
+            models.Index(
+                fields=['-created_at'], condition=models.Q(status='active'), name='deal_active_created_idx'
+            ),
+            models.Index(
+                fields=['stage', '-created_at'], condition=models.Q(status='active'), name='deal_active_stage_idx'
+            ),
+            models.Index(
+                fields=['owner', '-created_at'], condition=models.Q(status='active'), name='deal_active_owner_idx'
+            ),
+            # archive_deals looks for deals archived before a cutoff
+            models.Index(
+                fields=['updated_at'], condition=models.Q(status='archived'), name='deal_archived_updated_idx'
+            ),
+        ]
         app_label = 'models'
 
     def __str__(self):
         return f"{self.name} - {self.stage}"
 
+    @classmethod
+    def readable(cls, include_archived: bool = False):
+        """Manager for API reads: active deals, or every deal when the caller opted in"""
+        return cls.objects if include_archived else cls.active
+
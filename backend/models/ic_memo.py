@@ -18,6 +18,8 @@ class ICMemo(models.Model):
         default=dict,
         help_text="JSON object with keys: summary, market, product, traction, risks, open_questions"
     )
+    # Milestone versions survive compact_history's memo retention
+    is_milestone = models.BooleanField(default=False)
     created_by = models.ForeignKey(
         'User',
         on_delete=models.CASCADE,
@@ -35,13 +37,18 @@ class ICMemo(models.Model):
     def __str__(self):
         return f"{self.deal.name} - Memo v{self.version}"
 
-    def save(self, *args, **kwargs):
-        """Auto-increment version number for the deal"""
-        if not self.pk:  # Only for new memos
-            last_memo = ICMemo.objects.filter(deal=self.deal).order_by('-version').first()
-            if last_memo:
-                self.version = last_memo.version + 1
-            else:
-                self.version = 1
+    def save(self, *args, assign_version=True, **kwargs):
+        """
+        Auto-increment version number for the deal
+        (pass assign_version=False when the caller already set it)
+        """
+        if not self.pk and assign_version:  # Only for new memos
+            last_version = (
+                ICMemo.objects.filter(deal_id=self.deal_id)
+                .order_by('-version')
+                .values_list('version', flat=True)
+                .first()
+            )
+            self.version = (last_version or 0) + 1
         super().save(*args, **kwargs)
 
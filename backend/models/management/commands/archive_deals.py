@@ -0,0 +1,25 @@
+"""Move archived deals' activities, comments, votes and memos to cold storage"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.archive import archive_deals
+
+
+class Command(BaseCommand):
+    help = "Move child rows of deals archived more than ARCHIVE_AFTER_DAYS ago out of the hot tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ARCHIVE_AFTER_DAYS,
+            help="Only deals archived (last updated) at least this many days ago",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.ARCHIVE_BATCH_SIZE,
+            help="Rows moved per batch",
+        )
+
+    def handle(self, *args, **options):
+        moved = archive_deals(options['days'], options['batch_size'])
+        for kind, count in moved.items():
+            self.stdout.write(f"{kind}: moved {count} rows")
+        self.stdout.write(self.style.SUCCESS(f"Moved {sum(moved.values())} rows to cold storage"))
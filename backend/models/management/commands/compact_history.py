@@ -0,0 +1,50 @@
+"""Apply the retention policies for closed deals' memo versions and activity logs"""
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.retention import compact_memos, database_bytes, rollup_activities
+
+
+class Command(BaseCommand):
+    help = (
+        "Drop memo versions past MEMO_KEEP_VERSIONS (milestones are kept) and roll activities "
+        "older than ACTIVITY_ROLLUP_AFTER_DAYS into daily summaries, for deals in COMPACT_STAGES"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.COMPACT_BATCH_SIZE,
+            help="Rows per transaction",
+        )
+        parser.add_argument(
+            '--pause', type=float, default=settings.COMPACT_PAUSE,
+            help="Seconds to wait between transactions",
+        )
+        parser.add_argument(
+            '--vacuum', action='store_true',
+            help="VACUUM afterwards to return the freed pages to the filesystem (locks the database)",
+        )
+
+    def handle(self, *args, **options):
+        before = database_bytes()
+        memos = compact_memos(options['batch_size'], options['pause'])
+        self.stdout.write(f"memo versions deleted: {memos}")
+        activities = rollup_activities(options['batch_size'], options['pause'])
+        self.stdout.write(f"activities rolled up: {activities}")
+
+        after = database_bytes()
+        if before is None:
+            self.stdout.write(f"bytes reclaimed: not measured on {connection.vendor}")
+        else:
+            self.stdout.write(f"bytes reclaimed: {before - after} (free pages, reused by new rows)")
+
+        if options['vacuum'] and connection.vendor == 'sqlite':
+            path = connection.settings_dict['NAME']
+            size = os.path.getsize(path)
+            with connection.cursor() as cursor:
+                cursor.execute("VACUUM")
+            self.stdout.write(f"file size: {size} -> {os.path.getsize(path)} bytes")
+        self.stdout.write(self.style.SUCCESS("Compaction finished"))
@@ -0,0 +1,25 @@
+"""Copy the primary SQLite database onto the local stand-in replica"""
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = "Copy the default SQLite database to the 'replica' database (local development only)"
+
+    def handle(self, *args, **options):
+        if 'replica' not in connections.databases:
+            raise CommandError("No 'replica' database configured (set READ_REPLICA_ENABLED=true)")
+        primary, replica = connections.databases['default'], connections.databases['replica']
+        if 'sqlite3' not in primary['ENGINE'] or 'sqlite3' not in replica['ENGINE']:
+            raise CommandError("sync_replica only copies SQLite files; real replicas replicate themselves")
+
+        source = sqlite3.connect(str(primary['NAME']))
+        target = sqlite3.connect(str(replica['NAME']))
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
+        self.stdout.write(self.style.SUCCESS(f"Copied {primary['NAME']} to {replica['NAME']}"))
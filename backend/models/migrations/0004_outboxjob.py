@@ -0,0 +1,30 @@
+# Generated by Django 5.0.1 on 2026-10-19 12:48
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0003_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=50)),
+                ('payload', models.JSONField()),
+                ('locked_by', models.CharField(max_length=64)),
+                ('locked_at', models.DateTimeField(db_index=True)),
+                ('attempts', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Outbox Job',
+                'verbose_name_plural': 'Outbox Jobs',
+            },
+        ),
+    ]
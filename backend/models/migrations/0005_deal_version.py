@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 12:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0004_outboxjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deal',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
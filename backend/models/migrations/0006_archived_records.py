@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-19 13:01
+
+import django.utils.timezone
+from models.models import ArchiveJSONEncoder
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0005_deal_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deal',
+            name='in_cold_storage',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='ArchivedRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('deal_id', models.IntegerField()),
+                ('kind', models.CharField(choices=[('activity', 'Activity'), ('comment', 'Comment'), ('vote', 'Vote'), ('memo', 'IC Memo')], max_length=20)),
+                ('key', models.CharField(max_length=64)),
+                ('data', models.JSONField(encoder=ArchiveJSONEncoder)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Archived Record',
+                'verbose_name_plural': 'Archived Records',
+                'unique_together': {('deal_id', 'kind', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.1 on 2026-10-19 13:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0006_archived_records'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='icmemo',
+            name='is_milestone',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='ActivityRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('users', models.JSONField(default=dict)),
+                ('actions', models.JSONField(default=dict)),
+                ('first_at', models.DateTimeField()),
+                ('last_at', models.DateTimeField()),
+                ('deal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_rollups', to='models.deal')),
+            ],
+            options={
+                'verbose_name': 'Activity Rollup',
+                'verbose_name_plural': 'Activity Rollups',
+                'ordering': ['-day'],
+                'unique_together': {('deal', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-19 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0007_history_compaction'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['deal', '-created_at'], name='activity_deal_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['deal', '-created_at'], name='comment_deal_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deal',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['-created_at'], name='deal_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deal',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['stage', '-created_at'], name='deal_active_stage_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deal',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['owner', '-created_at'], name='deal_active_owner_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deal',
+            index=models.Index(condition=models.Q(('status', 'archived')), fields=['updated_at'], name='deal_archived_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['deal', '-created_at'], name='vote_deal_created_idx'),
+        ),
+    ]
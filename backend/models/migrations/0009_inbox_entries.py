@@ -0,0 +1,60 @@
+# Generated by Django 5.0.1 on 2026-10-19 13:08
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_inboxes(apps, schema_editor):
+    """Existing owners, commenters and voters follow their deals, with nothing unread"""
+    Deal = apps.get_model('models', 'Deal')
+    Comment = apps.get_model('models', 'Comment')
+    Vote = apps.get_model('models', 'Vote')
+    InboxEntry = apps.get_model('models', 'InboxEntry')
+
+    now = django.utils.timezone.now()
+    followers = {}
+    for reason, rows in [
+        ('owner', Deal.objects.values_list('owner_id', 'id')),
+        ('comment', Comment.objects.values_list('user_id', 'deal_id')),
+        ('vote', Vote.objects.values_list('user_id', 'deal_id')),
+    ]:
+        for user_id, deal_id in rows:
+            followers.setdefault((user_id, deal_id), reason)
+    InboxEntry.objects.bulk_create(
+        [
+            InboxEntry(user_id=user_id, deal_id=deal_id, reason=reason, last_activity_at=now, last_seen_at=now)
+            for (user_id, deal_id), reason in followers.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0008_active_deal_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InboxEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('owner', 'Owner'), ('comment', 'Commented'), ('vote', 'Voted')], max_length=20)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('last_activity_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_seen_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('deal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox_entries', to='models.deal')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Inbox Entry',
+                'verbose_name_plural': 'Inbox Entries',
+                'indexes': [models.Index(fields=['user', '-last_activity_at'], name='inbox_user_activity_idx')],
+                'unique_together': {('user', 'deal')},
+            },
+        ),
+        migrations.RunPython(backfill_inboxes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,115 @@
+# Generated by Django 5.0.1 on 2026-10-19 13:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+# IC_DECISION as it stood when this migration was written; frozen so the
+# backfill doesn't change with later code or settings
+WEIGHTS = {'Admin': 1, 'Partner': 1}
+QUORUM = 2
+APPROVE_THRESHOLD = 0.5
+
+
+def weight_of(role_name, level):
+    if role_name in WEIGHTS:
+        return WEIGHTS[role_name]
+    return WEIGHTS.get(level, 1)
+
+
+def evaluate(approve_count, decline_count, approve_weight, decline_weight):
+    if approve_count + decline_count < QUORUM:
+        return 'pending'
+    total = approve_weight + decline_weight
+    if total and approve_weight / total > APPROVE_THRESHOLD:
+        return 'approved'
+    return 'declined'
+
+
+def backfill_decisions(apps, schema_editor):
+    """
+    Weigh existing votes by their voter's current role and build each deal's
+    counters, including cold-storage votes no hot vote has replaced
+    """
+    Vote = apps.get_model('models', 'Vote')
+    User = apps.get_model('models', 'User')
+    ArchivedRecord = apps.get_model('models', 'ArchivedRecord')
+    DealDecision = apps.get_model('models', 'DealDecision')
+
+    weights = {
+        user.id: weight_of(user.role.name, user.role.hierarchy_level) if user.role else weight_of(None, None)
+        for user in User.objects.select_related('role')
+    }
+    counters = {}
+
+    def count(deal_id, vote, weight):
+        totals = counters.setdefault(deal_id, {'approve': [0, 0], 'decline': [0, 0]})
+        totals[vote][0] += 1
+        totals[vote][1] += weight
+
+    votes = list(Vote.objects.all())
+    for vote in votes:
+        vote.weight = weights.get(vote.user_id, 1)
+        count(vote.deal_id, vote.vote, vote.weight)
+    Vote.objects.bulk_update(votes, ['weight'], batch_size=1000)
+
+    hot = {(vote.deal_id, vote.user_id) for vote in votes}
+    for data in ArchivedRecord.objects.filter(kind='vote').values_list('data', flat=True):
+        if (data['deal_id'], data['user_id']) not in hot and data['user_id'] in weights:
+            count(data['deal_id'], data['vote'], weights[data['user_id']])
+
+    now = django.utils.timezone.now()
+    decisions = []
+    for deal_id, totals in counters.items():
+        (approve, approve_weight), (decline, decline_weight) = totals['approve'], totals['decline']
+        outcome = evaluate(approve, decline, approve_weight, decline_weight)
+        decisions.append(DealDecision(
+            deal_id=deal_id, approve_count=approve, decline_count=decline,
+            approve_weight=approve_weight, decline_weight=decline_weight,
+            outcome=outcome, decided_at=now if outcome != 'pending' else None,
+        ))
+    DealDecision.objects.bulk_create(decisions, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0009_inbox_entries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DealDecision',
+            fields=[
+                ('deal', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='decision', serialize=False, to='models.deal')),
+                ('approve_count', models.IntegerField(default=0)),
+                ('decline_count', models.IntegerField(default=0)),
+                ('approve_weight', models.IntegerField(default=0)),
+                ('decline_weight', models.IntegerField(default=0)),
+                ('outcome', models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('declined', 'Declined')], default='pending', max_length=20)),
+                ('decided_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Deal Decision',
+                'verbose_name_plural': 'Deal Decisions',
+            },
+        ),
+        migrations.AddField(
+            model_name='vote',
+            name='previous_vote',
+            field=models.CharField(blank=True, choices=[('approve', 'Approve'), ('decline', 'Decline')], max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='vote',
+            name='previous_weight',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='vote',
+            name='weight',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.RunPython(backfill_decisions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 13:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0010_deal_decisions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='revokedtoken',
+            name='rotated',
+            field=models.BooleanField(default=False),
+        ),
+    ]
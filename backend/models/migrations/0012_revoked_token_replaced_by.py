@@ -0,0 +1,27 @@
+# Generated by Django 5.0.1 on 2026-10-19 13:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0011_revoked_token_rotated'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='revokedtoken',
+            name='rotated',
+        ),
+        migrations.AddField(
+            model_name='revokedtoken',
+            name='grace_used',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='revokedtoken',
+            name='replaced_by',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
@@ -1,5 +1,8 @@
 """All Django models for the Deal Pipeline application"""
-from django.db import models
+import datetime
+
+from django.db import IntegrityError, connections, models, router
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
@@ -56,6 +59,8 @@ class User(AbstractUser):
         blank=True,
         related_name='users'
     )
+    # Bumped whenever previously issued tokens must stop working (role change, deactivation)
+    token_version = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -70,31 +75,42 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.email} ({self.role.name if self.role else 'No Role'})"
 
+    # Role checks go through the compiled permission registry in core.permissions,
+    # which looks roles up by role_id and never lazy-loads self.role
+
     def has_permission(self, permission: str) -> bool:
         """Check if user has a specific permission"""
-        if not self.role:
-            return False
-        return permission in self.role.permissions
+        from core.permissions import check_permission
+        return check_permission(self, permission)
 
     def is_admin(self) -> bool:
         """Check if user is Admin"""
-        return self.role and self.role.name == 'Admin'
+        from core.permissions import is_admin
+        return is_admin(self)
 
     def is_analyst(self) -> bool:
         """Check if user is Analyst"""
-        return self.role and self.role.name == 'Analyst'
+        from core.permissions import role_of, ANALYST
+        role = role_of(self)
+        return role is not None and role.name == ANALYST
 
     def is_partner(self) -> bool:
         """Check if user is Partner"""
-        return self.role and self.role.name == 'Partner'
+        from core.permissions import role_of, PARTNER
+        role = role_of(self)
+        return role is not None and role.name == PARTNER
 
     def can_edit_deal(self, deal) -> bool:
         """Check if user can edit a deal"""
-        if self.is_admin():
-            return True
-        if self.is_analyst() and deal.owner_id == self.id:
-            return True
-        return False
+        from core.permissions import can_edit_deal
+        return can_edit_deal(self, deal)
+
+
+class ActiveDealManager(models.Manager):
+    """Deals still in the pipeline (status 'active'); what the API reads by default"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(status='active')
 
 
 class Deal(models.Model):
@@ -139,17 +155,45 @@ class Deal(models.Model):
         choices=STATUS_CHOICES,
         default='active'
     )
+    # Incremented by every edit; clients send it back (If-Match) to detect conflicting edits
+    version = models.PositiveIntegerField(default=1)
+    # Set once archive_deals has moved (some of) the deal's child rows to ArchivedRecord
+    in_cold_storage = models.BooleanField(default=False)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = models.Manager()
+    active = ActiveDealManager()
+
     class Meta:
         verbose_name = "Deal"
         verbose_name_plural = "Deals"
         ordering = ['-created_at']
+        # Partial indexes: they only hold the active pipeline however many deals are archived
+        indexes = [
+            models.Index(
+                fields=['-created_at'], condition=models.Q(status='active'), name='deal_active_created_idx'
+            ),
+            models.Index(
+                fields=['stage', '-created_at'], condition=models.Q(status='active'), name='deal_active_stage_idx'
+            ),
+            models.Index(
+                fields=['owner', '-created_at'], condition=models.Q(status='active'), name='deal_active_owner_idx'
+            ),
+            # archive_deals looks for deals archived before a cutoff
+            models.Index(
+                fields=['updated_at'], condition=models.Q(status='archived'), name='deal_archived_updated_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.stage}"
 
+    @classmethod
+    def readable(cls, include_archived: bool = False):
+        """Manager for API reads: active deals, or every deal when the caller opted in"""
+        return cls.objects if include_archived else cls.active
+
 
 class ICMemo(models.Model):
     """
@@ -166,6 +210,8 @@ class ICMemo(models.Model):
         default=dict,
         help_text="JSON object with keys: summary, market, product, traction, risks, open_questions"
     )
+    # Milestone versions survive compact_history's memo retention
+    is_milestone = models.BooleanField(default=False)
     created_by = models.ForeignKey(
         'User',
         on_delete=models.CASCADE,
@@ -182,14 +228,19 @@ class ICMemo(models.Model):
     def __str__(self):
         return f"{self.deal.name} - Memo v{self.version}"
 
-    def save(self, *args, **kwargs):
-        """Auto-increment version number for the deal"""
-        if not self.pk:  # Only for new memos
-            last_memo = ICMemo.objects.filter(deal=self.deal).order_by('-version').first()
-            if last_memo:
-                self.version = last_memo.version + 1
-            else:
-                self.version = 1
+    def save(self, *args, assign_version=True, **kwargs):
+        """
+        Auto-increment version number for the deal
+        (pass assign_version=False when the caller already set it)
+        """
+        if not self.pk and assign_version:  # Only for new memos
+            last_version = (
+                ICMemo.objects.filter(deal_id=self.deal_id)
+                .order_by('-version')
+                .values_list('version', flat=True)
+                .first()
+            )
+            self.version = (last_version or 0) + 1
         super().save(*args, **kwargs)
 
 
@@ -217,11 +268,41 @@ class Activity(models.Model):
         verbose_name = "Activity"
         verbose_name_plural = "Activities"
         ordering = ['-created_at']
+        # A deal's activities, newest first, straight from the index
+        indexes = [models.Index(fields=['deal', '-created_at'], name='activity_deal_created_idx')]
 
     def __str__(self):
         return f"{self.user.email}: {self.action}"
 
 
+class ActivityRollup(models.Model):
+    """
+    One day of a deal's activity log, compacted by compact_history once the
+    individual entries passed their retention period.
+    """
+    deal = models.ForeignKey(
+        'Deal',
+        on_delete=models.CASCADE,
+        related_name='activity_rollups'
+    )
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+    # Entries per user id and per action verb, e.g. {"moved": 2, "updated": 1}
+    users = models.JSONField(default=dict)
+    actions = models.JSONField(default=dict)
+    first_at = models.DateTimeField()
+    last_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Activity Rollup"
+        verbose_name_plural = "Activity Rollups"
+        ordering = ['-day']
+        unique_together = ['deal', 'day']
+
+    def __str__(self):
+        return f"{self.deal_id} on {self.day}: {self.count} activities"
+
+
 class Comment(models.Model):
     """
     Comments on deals for collaboration.
@@ -245,6 +326,8 @@ class Comment(models.Model):
         verbose_name = "Comment"
         verbose_name_plural = "Comments"
         ordering = ['-created_at']
+        # A deal's comments, newest first, straight from the index
+        indexes = [models.Index(fields=['deal', '-created_at'], name='comment_deal_created_idx')]
 
     def __str__(self):
         return f"{self.user.email} on {self.deal.name}"
@@ -274,6 +357,11 @@ class Vote(models.Model):
         choices=VOTE_CHOICES
     )
     comment = models.TextField(blank=True, null=True)
+    # Voter's weight in the IC decision (core.decisions), fixed when the vote is cast
+    weight = models.PositiveIntegerField(default=1)
+    # What this row held before its last upsert, so the deal's counters can be adjusted
+    previous_vote = models.CharField(max_length=10, choices=VOTE_CHOICES, blank=True, null=True)
+    previous_weight = models.PositiveIntegerField(blank=True, null=True)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -281,8 +369,234 @@ class Vote(models.Model):
         verbose_name = "Vote"
         verbose_name_plural = "Votes"
         ordering = ['-created_at']
+        # A deal's votes, newest first, straight from the index
+        indexes = [models.Index(fields=['deal', '-created_at'], name='vote_deal_created_idx')]
         unique_together = ['deal', 'user']
 
     def __str__(self):
         return f"{self.user.email} - {self.vote} on {self.deal.name}"
 
+    @classmethod
+    def upsert(cls, deal_id: int, user_id: int, vote: str, comment=None, weight: int = 1) -> "Vote":
+        """
+        Insert the user's vote on a deal or replace it, in one atomic statement
+        (INSERT ... ON CONFLICT (deal_id, user_id) DO UPDATE ... RETURNING).
+        Concurrent votes by the same user can't race on unique (deal, user);
+        the last statement wins. The returned row's previous_vote and
+        previous_weight are what it replaced (None for a first vote), and
+        deal_in_cold_storage is its deal's flag (see core.archive).
+        Raises IntegrityError if the deal doesn't exist.
+        """
+        alias = router.db_for_write(cls)
+        connection = connections[alias]
+        table = connection.ops.quote_name(cls._meta.db_table)
+        deal_table = connection.ops.quote_name(Deal._meta.db_table)
+        now = cls._meta.get_field('updated_at').get_db_prep_value(timezone.now(), connection)
+        rows = cls.objects.raw(
+            f"""
+            INSERT INTO {table} (deal_id, user_id, vote, comment, weight, created_at, updated_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (deal_id, user_id) DO UPDATE SET
+                previous_vote = {table}.vote,
+                previous_weight = {table}.weight,
+                vote = excluded.vote,
+                weight = excluded.weight,
+                comment = excluded.comment,
+                updated_at = excluded.updated_at
+            RETURNING id, deal_id, user_id, vote, comment, weight, previous_vote, previous_weight,
+                created_at, updated_at,
+                (SELECT in_cold_storage FROM {deal_table} WHERE id = {table}.deal_id) AS deal_in_cold_storage
+            """,
+            [deal_id, user_id, vote, comment, weight, now, now],
+            using=alias,
+        )
+        row = list(rows)[0]
+        if row.deal_in_cold_storage is None:
+            # Inside a transaction SQLite only checks the deferred FK at COMMIT
+            raise IntegrityError(f"Deal {deal_id} does not exist")
+        return row
+
+
+class DealDecision(models.Model):
+    """
+    Running IC vote counters for a deal and the decision they add up to
+    (core.decisions). Adjusted by every cast_vote instead of recounting votes.
+    """
+    PENDING = 'pending'
+    APPROVED = 'approved'
+    DECLINED = 'declined'
+    OUTCOME_CHOICES = [
+        (PENDING, 'Pending'),
+        (APPROVED, 'Approved'),
+        (DECLINED, 'Declined'),
+    ]
+
+    deal = models.OneToOneField(
+        'Deal',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='decision'
+    )
+    approve_count = models.IntegerField(default=0)
+    decline_count = models.IntegerField(default=0)
+    approve_weight = models.IntegerField(default=0)
+    decline_weight = models.IntegerField(default=0)
+    outcome = models.CharField(max_length=20, choices=OUTCOME_CHOICES, default=PENDING)
+    decided_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Deal Decision"
+        verbose_name_plural = "Deal Decisions"
+
+    def __str__(self):
+        return f"{self.deal_id}: {self.outcome}"
+
+    @classmethod
+    def add(cls, deal_id: int, approve: int, decline: int, approve_weight: int, decline_weight: int) -> "DealDecision":
+        """Add to a deal's counters (creating them at zero first) in one statement; returns the new totals"""
+        alias = router.db_for_write(cls)
+        connection = connections[alias]
+        table = connection.ops.quote_name(cls._meta.db_table)
+        now = cls._meta.get_field('updated_at').get_db_prep_value(timezone.now(), connection)
+        rows = cls.objects.raw(
+            f"""
+            INSERT INTO {table}
+                (deal_id, approve_count, decline_count, approve_weight, decline_weight, outcome, updated_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (deal_id) DO UPDATE SET
+                approve_count = {table}.approve_count + excluded.approve_count,
+                decline_count = {table}.decline_count + excluded.decline_count,
+                approve_weight = {table}.approve_weight + excluded.approve_weight,
+                decline_weight = {table}.decline_weight + excluded.decline_weight,
+                updated_at = excluded.updated_at
+            RETURNING deal_id, approve_count, decline_count, approve_weight, decline_weight,
+                outcome, decided_at, updated_at
+            """,
+            [deal_id, approve, decline, approve_weight, decline_weight, cls.PENDING, now],
+            using=alias,
+        )
+        return list(rows)[0]
+
+
+class InboxEntry(models.Model):
+    """
+    A deal in a user's inbox (they own it, commented or voted on it) with the
+    user's read watermark and the number of changes by others since then.
+    Maintained incrementally by core.inbox.
+    """
+    REASON_CHOICES = [
+        ('owner', 'Owner'),
+        ('comment', 'Commented'),
+        ('vote', 'Voted'),
+    ]
+
+    user = models.ForeignKey(
+        'User',
+        on_delete=models.CASCADE,
+        related_name='inbox_entries'
+    )
+    deal = models.ForeignKey(
+        'Deal',
+        on_delete=models.CASCADE,
+        related_name='inbox_entries'
+    )
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    unread_count = models.PositiveIntegerField(default=0)
+    last_activity_at = models.DateTimeField(default=timezone.now)
+    # Watermark: changes made up to this point count as read
+    last_seen_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Inbox Entry"
+        verbose_name_plural = "Inbox Entries"
+        unique_together = ['user', 'deal']
+        indexes = [models.Index(fields=['user', '-last_activity_at'], name='inbox_user_activity_idx')]
+
+    def __str__(self):
+        return f"{self.user_id} / {self.deal_id}: {self.unread_count} unread"
+
+
+class RevokedToken(models.Model):
+    """
+    Revoked JWTs, indexed by their jti. API workers mirror this table in
+    memory; rows are deleted once the token would have expired anyway.
+    """
+    jti = models.CharField(max_length=64, unique=True)
+    user = models.ForeignKey(
+        'User',
+        on_delete=models.CASCADE,
+        related_name='revoked_tokens'
+    )
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(default=timezone.now)
+    # jti of the refresh token /refresh issued in its place (None: revoked by logout)
+    replaced_by = models.CharField(max_length=64, blank=True, null=True)
+    # Its one replay within REFRESH_REUSE_GRACE_SECONDS has been honoured
+    grace_used = models.BooleanField(default=False)
+
+    class Meta:
+        verbose_name = "Revoked Token"
+        verbose_name_plural = "Revoked Tokens"
+
+    def __str__(self):
+        return f"{self.jti} (expires {self.expires_at})"
+
+
+class OutboxJob(models.Model):
+    """
+    Durable record of a background job (core.jobs with JOBS_DURABLE).
+    Written with the request, deleted once the job has run; rows whose lease
+    expired without being deleted are picked up again after a crash.
+    """
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField()
+    locked_by = models.CharField(max_length=64)
+    locked_at = models.DateTimeField(db_index=True)
+    attempts = models.IntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Outbox Job"
+        verbose_name_plural = "Outbox Jobs"
+
+    def __str__(self):
+        return f"{self.kind} #{self.id}"
+
+
+class ArchiveJSONEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder without its millisecond rounding, so archived timestamps round-trip exactly"""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class ArchivedRecord(models.Model):
+    """
+    Cold-storage copy of an archived deal's activity, comment, vote or memo
+    version (see core.archive). The row's values are kept as JSON and deal_id
+    is a plain integer, so the table can live in a separate archive database.
+    """
+    KIND_CHOICES = [
+        ('activity', 'Activity'),
+        ('comment', 'Comment'),
+        ('vote', 'Vote'),
+        ('memo', 'IC Memo'),
+    ]
+
+    deal_id = models.IntegerField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # Identifies the row within its deal: the id, or the voter / memo version
+    key = models.CharField(max_length=64)
+    data = models.JSONField(encoder=ArchiveJSONEncoder)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Archived Record"
+        verbose_name_plural = "Archived Records"
+        unique_together = ['deal_id', 'kind', 'key']
+
+    def __str__(self):
+        return f"{self.kind} {self.key} of deal {self.deal_id}"
@@ -0,0 +1,45 @@
+"""Model signal handlers"""
+from django.conf import settings
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Role, User
+
+# Role fields copied into stateless access tokens (core.auth.token_claims)
+TOKEN_ROLE_FIELDS = ('name', 'hierarchy_level', 'permissions')
+
+
+@receiver(pre_save, sender=Role)
+def remember_token_role_fields(sender, instance, **kwargs):
+    """Keep the stored values of the token-embedded fields for the post_save check"""
+    if settings.JWT_STATELESS_AUTH and instance.pk is not None:
+        instance._token_fields = (
+            Role.objects.filter(pk=instance.pk).values_list(*TOKEN_ROLE_FIELDS).first()
+        )
+
+
+@receiver(post_save, sender=Role)
+def revoke_tokens_on_role_change(sender, instance, created, **kwargs):
+    """Stateless tokens embed the role; retire them when what they embed changes"""
+    previous = getattr(instance, '_token_fields', None)
+    if created or previous is None:
+        return
+    if previous != tuple(getattr(instance, field) for field in TOKEN_ROLE_FIELDS):
+        User.objects.filter(role=instance).update(token_version=F('token_version') + 1)
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def invalidate_permission_registry(sender, **kwargs):
+    """Recompile role permissions on next use"""
+    from core.permissions import permission_registry
+    permission_registry.invalidate()
+
+
+@receiver(post_save, sender=Role)
+def invalidate_cached_responses(sender, instance, created, **kwargs):
+    """Cached responses embed role names"""
+    if not created:
+        from core.cache import response_cache, USERS_TAG
+        response_cache.invalidate(USERS_TAG)
@@ -16,6 +16,8 @@ class User(AbstractUser):
         blank=True,
         related_name='users'
     )
+    # Bumped whenever previously issued tokens must stop working (role change, deactivation)
+    token_version = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -31,29 +33,33 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.email} ({self.role.name if self.role else 'No Role'})"
 
+    # Role checks go through the compiled permission registry in core.permissions,
+    # which looks roles up by role_id and never lazy-loads self.role
+
     def has_permission(self, permission: str) -> bool:
         """Check if user has a specific permission"""
-        if not self.role:
-            return False
-        return permission in self.role.permissions
+        from core.permissions import check_permission
+        return check_permission(self, permission)
 
     def is_admin(self) -> bool:
         """Check if user is Admin"""
-        return self.role and self.role.name == 'Admin'
+        from core.permissions import is_admin
+        return is_admin(self)
 
     def is_analyst(self) -> bool:
         """Check if user is Analyst"""
-        return self.role and self.role.name == 'Analyst'
+        from core.permissions import role_of, ANALYST
+        role = role_of(self)
+        return role is not None and role.name == ANALYST
 
     def is_partner(self) -> bool:
         """Check if user is Partner"""
-        return self.role and self.role.name == 'Partner'
+        from core.permissions import role_of, PARTNER
+        role = role_of(self)
+        return role is not None and role.name == PARTNER
 
     def can_edit_deal(self, deal) -> bool:
         """Check if user can edit a deal"""
-        if self.is_admin():
-            return True
-        if self.is_analyst() and deal.owner_id == self.id:
-            return True
-        return False
+        from core.permissions import can_edit_deal
+        return can_edit_deal(self, deal)
 
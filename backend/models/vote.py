@@ -27,6 +27,11 @@ class Vote(models.Model):
         choices=VOTE_CHOICES
     )
     comment = models.TextField(blank=True, null=True)
+    # Voter's weight in the IC decision (core.decisions), fixed when the vote is cast
+    weight = models.PositiveIntegerField(default=1)
+    # What this row held before its last upsert, so the deal's counters can be adjusted
+    previous_vote = models.CharField(max_length=10, choices=VOTE_CHOICES, blank=True, null=True)
+    previous_weight = models.PositiveIntegerField(blank=True, null=True)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -34,6 +39,8 @@ class Vote(models.Model):
         verbose_name = "Vote"
         verbose_name_plural = "Votes"
         ordering = ['-created_at']
+        # A deal's votes, newest first, straight from the index
+        indexes = [models.Index(fields=['deal', '-created_at'], name='vote_deal_created_idx')]
         unique_together = ['deal', 'user']
         app_label = 'models'
 
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+Production server entry point.
+
+Runs main:app under uvicorn with one worker process per CPU (or
+SERVER_WORKERS), uvloop/httptools when installed, tuned keep-alive and a
+graceful shutdown window that lets in-flight requests drain. The AnyIO
+threadpool used by sync handlers is sized in main.py's startup hook from
+SERVER_THREADPOOL_SIZE / DB_MAX_CONNECTIONS_PER_WORKER.
+
+Usage:
+    python serve.py [--host 0.0.0.0] [--port 7000] [--workers N]
+
+For development keep using `uvicorn main:app --reload`.
+"""
+import argparse
+import importlib.util
+import os
+import sys
+
+import uvicorn
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings_api')
+
+from django.conf import settings  # noqa: E402
+
+
+def default_workers() -> int:
+    """SERVER_WORKERS if set, otherwise one worker per available CPU"""
+    if settings.SERVER_WORKERS:
+        return settings.SERVER_WORKERS
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS
+        return os.cpu_count() or 1
+
+
+def server_config(host: str, port: int, workers: int) -> dict:
+    """Keyword arguments for uvicorn.run()"""
+    has_uvloop = importlib.util.find_spec('uvloop') is not None
+    has_httptools = importlib.util.find_spec('httptools') is not None
+    return {
+        'host': host,
+        'port': port,
+        'workers': workers,
+        'loop': 'uvloop' if has_uvloop else 'asyncio',
+        'http': 'httptools' if has_httptools else 'h11',
+        'backlog': settings.SERVER_BACKLOG,
+        'timeout_keep_alive': settings.SERVER_KEEP_ALIVE,
+        'timeout_graceful_shutdown': settings.SERVER_GRACEFUL_SHUTDOWN,
+        'limit_concurrency': settings.SERVER_LIMIT_CONCURRENCY or None,
+        'limit_max_requests': settings.SERVER_MAX_REQUESTS or None,
+        'proxy_headers': True,
+        'forwarded_allow_ips': settings.FORWARDED_ALLOW_IPS,
+        'access_log': settings.SERVER_ACCESS_LOG,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Deal Pipeline API")
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 7000)))
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    config = server_config(args.host, args.port, args.workers or default_workers())
+    print(
+        f"Starting {config['workers']} worker(s) on {args.host}:{args.port} "
+        f"(loop={config['loop']}, http={config['http']})"
+    )
+    uvicorn.run('main:app', **config)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Shared test setup: the API settings on a throwaway SQLite database, migrated
+and seeded once per session. Tokens are stateless so authentication costs no
+query, and the response cache and rate limits are off so requests hit the
+handlers every time.
+"""
+import os
+import tempfile
+
+os.environ['DJANGO_SETTINGS_MODULE'] = 'core.settings_api'
+os.environ['JWT_STATELESS_AUTH'] = 'true'
+os.environ['RATE_LIMIT_ENABLED'] = 'false'
+os.environ['RESPONSE_CACHE_ENABLED'] = 'false'
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+settings.DATABASES['default']['NAME'] = os.path.join(tempfile.mkdtemp(), 'tests.sqlite3')
+django.setup()
+
+import pytest  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+
+@pytest.fixture(scope='session', autouse=True)
+def database():
+    call_command('migrate', verbosity=0)
+    import seed_data
+    seed_data.seed_roles()
+    seed_data.seed_users()
+
+
+@pytest.fixture(scope='session')
+def client(database):
+    """Client for the app with its startup run (background job queue included)"""
+    from main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope='session')
+def admin_headers(client):
+    token = client.post(
+        '/api/auth/login', json={'email': 'admin@dealflow.com', 'password': 'admin123'}
+    ).json()['access_token']
+    return {'Authorization': f'Bearer {token}'}
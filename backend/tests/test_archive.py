@@ -0,0 +1,33 @@
+"""Moving archived deals' child rows to cold storage"""
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from core.archive import archive_deals
+from models.models import ArchivedRecord, Comment, Deal, User
+
+
+def archived_deal_with_comments(count: int) -> Deal:
+    owner = User.objects.get(email='analyst@dealflow.com')
+    deal = Deal.objects.create(name='Cold', owner=owner, status='archived')
+    Comment.objects.bulk_create([Comment(deal=deal, user=owner, content=f'c{n}') for n in range(count)])
+    Deal.objects.filter(id=deal.id).update(updated_at=timezone.now() - timedelta(days=365))
+    return deal
+
+
+def test_rows_move_to_cold_storage():
+    deal = archived_deal_with_comments(3)
+    archive_deals(days=30)
+    assert not Comment.objects.filter(deal=deal).exists()
+    assert ArchivedRecord.objects.filter(deal_id=deal.id, kind='comment').count() == 3
+    assert Deal.objects.get(id=deal.id).in_cold_storage
+
+
+def test_hot_rows_stay_until_the_copy_is_confirmed(monkeypatch):
+    deal = archived_deal_with_comments(2)
+    monkeypatch.setattr(ArchivedRecord.objects, 'bulk_create', lambda *args, **kwargs: [])
+    with pytest.raises(RuntimeError):
+        archive_deals(days=30)
+    assert Comment.objects.filter(deal=deal).count() == 2
+    assert not Deal.objects.get(id=deal.id).in_cold_storage
@@ -0,0 +1,58 @@
+"""Refresh token rotation: the reuse grace and what ends it"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from models.models import RevokedToken, User
+
+EMAIL = 'analyst@dealflow.com'
+
+
+def login(client):
+    return client.post('/api/auth/login', json={'email': EMAIL, 'password': 'analyst123'}).json()
+
+
+def refresh(client, token):
+    return client.post('/api/auth/refresh', json={'refresh_token': token})
+
+
+def bearer(pair):
+    return {'Authorization': f"Bearer {pair['access_token']}"}
+
+
+def test_replay_within_grace_is_honoured_once(client):
+    pair = login(client)
+    assert refresh(client, pair['refresh_token']).status_code == 200
+    assert refresh(client, pair['refresh_token']).status_code == 200
+    assert refresh(client, pair['refresh_token']).status_code == 401
+
+
+def test_replay_after_logout_of_replacement_is_rejected(client):
+    pair = login(client)
+    rotated = refresh(client, pair['refresh_token']).json()
+    logout = client.post(
+        '/api/auth/logout', json={'refresh_token': rotated['refresh_token']}, headers=bearer(rotated)
+    )
+    assert logout.status_code == 200
+
+    assert refresh(client, pair['refresh_token']).status_code == 401
+
+
+def test_replay_after_grace_revokes_every_session(client):
+    pair = login(client)
+    other = login(client)
+    rotated = refresh(client, pair['refresh_token']).json()
+    version = User.objects.get(email=EMAIL).token_version
+    RevokedToken.objects.update(revoked_at=timezone.now() - timedelta(hours=1))
+
+    assert refresh(client, pair['refresh_token']).status_code == 401
+
+    assert User.objects.get(email=EMAIL).token_version == version + 1
+    for session in (rotated, other):
+        assert client.get('/api/auth/me', headers=bearer(session)).status_code == 401
+        assert refresh(client, session['refresh_token']).status_code == 401
+
+
+def test_logout_without_body(client):
+    pair = login(client)
+    assert client.post('/api/auth/logout', headers=bearer(pair)).status_code == 200
@@ -0,0 +1,44 @@
+"""Background job batches with a bad payload"""
+import asyncio
+
+from django.test.utils import override_settings
+
+from core.jobs import JobQueue, job_handler
+
+ran = []
+failed_once = set()
+
+
+@job_handler("test-picky")
+def picky(payloads):
+    """Fails on any 'bad' payload, and the first time it sees a 'flaky' one"""
+    for payload in payloads:
+        if payload.get("bad"):
+            raise ValueError("bad payload")
+        if payload.get("flaky") and payload["n"] not in failed_once:
+            failed_once.add(payload["n"])
+            raise ValueError("flaky payload")
+    ran.extend(payload["n"] for payload in payloads)
+
+
+def queue_with(payloads) -> JobQueue:
+    queue = JobQueue()
+    queue._pending = [("test-picky", payload, None, 0) for payload in payloads]
+    return queue
+
+
+def test_bad_payload_only_fails_itself():
+    ran.clear()
+    queue = queue_with([{"n": 1}, {"n": 2, "bad": True}, {"n": 3}])
+    queue.flush()
+    assert ran == [1, 3]
+    assert [(job[1]["n"], job[3]) for job in queue._pending] == [(2, 1)]
+
+
+@override_settings(JOBS_MAX_ATTEMPTS=3)
+def test_stop_drains_retries():
+    ran.clear()
+    queue = queue_with([{"n": 1, "bad": True}, {"n": 2, "flaky": True}])
+    asyncio.run(queue.stop())
+    assert ran == [2]
+    assert queue.pending() == 0
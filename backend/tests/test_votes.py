@@ -0,0 +1,53 @@
+"""Vote.upsert under concurrent votes by the same user on the same deal"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from django.db import IntegrityError, connection
+
+from models.models import Deal, User, Vote
+
+THREADS = 8
+ROUNDS = 10
+
+
+def race(deal, user):
+    """Cast the user's vote from THREADS threads at once; returns the IntegrityErrors raised"""
+    barrier = threading.Barrier(THREADS)
+    errors = []
+
+    def vote(index):
+        barrier.wait()
+        try:
+            Vote.upsert(deal.id, user.id, 'approve' if index % 2 else 'decline')
+        except IntegrityError as exc:
+            errors.append(exc)
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(vote, range(THREADS)))
+    return errors
+
+
+def test_concurrent_upserts_leave_one_vote():
+    partner = User.objects.get(email='partner@dealflow.com')
+    for _ in range(ROUNDS):
+        deal = Deal.objects.create(name='Race', owner=partner)
+        assert race(deal, partner) == []
+        assert Vote.objects.filter(deal=deal, user=partner).count() == 1
+
+
+def test_vote_rolls_back_when_the_decision_update_fails(client, admin_headers, monkeypatch):
+    from api import interactions
+
+    deal_id = client.post('/api/deals', json={'name': 'Atomic'}, headers=admin_headers).json()['id']
+
+    def fail(vote, user):
+        raise RuntimeError('decision update failed')
+
+    monkeypatch.setattr(interactions, 'record_vote', fail)
+    with pytest.raises(RuntimeError):
+        client.post(f'/api/deals/{deal_id}/vote', json={'vote': 'approve'}, headers=admin_headers)
+    assert not Vote.objects.filter(deal_id=deal_id).exists()
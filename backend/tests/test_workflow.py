@@ -0,0 +1,61 @@
+"""Deal stage moves through DEAL_WORKFLOW"""
+import pytest
+
+from django.conf import settings
+from django.db.models import Value
+
+from core.workflow import Guard, get_workflow
+from models.models import Deal
+
+
+def test_failing_hook_undoes_the_stage_move(client, admin_headers, monkeypatch):
+    deal_id = client.post('/api/deals', json={'name': 'Hooked'}, headers=admin_headers).json()['id']
+    client.post(f'/api/deals/{deal_id}/memos', json={'sections': {}}, headers=admin_headers)
+    for stage in ('Screen', 'Diligence'):
+        client.patch(f'/api/deals/{deal_id}/stage', json={'stage': stage}, headers=admin_headers)
+    before = Deal.objects.get(id=deal_id)
+
+    def fail(deal, old_stage, user):
+        raise RuntimeError('hook failed')
+
+    monkeypatch.setitem(get_workflow().hooks, 'IC', (fail,))
+    with pytest.raises(RuntimeError):
+        client.patch(f'/api/deals/{deal_id}/stage', json={'stage': 'IC'}, headers=admin_headers)
+    after = Deal.objects.get(id=deal_id)
+    assert (after.stage, after.version) == ('Diligence', before.version)
+
+
+def deal_in_ic(client, headers):
+    deal_id = client.post('/api/deals', json={'name': 'Decided'}, headers=headers).json()['id']
+    client.post(f'/api/deals/{deal_id}/memos', json={'sections': {}}, headers=headers)
+    for stage in ('Screen', 'Diligence', 'IC'):
+        client.patch(f'/api/deals/{deal_id}/stage', json={'stage': stage}, headers=headers)
+    return deal_id
+
+
+@pytest.fixture
+def auto_advance(client, monkeypatch):
+    monkeypatch.setitem(settings.IC_DECISION, 'auto_advance', True)
+    token = client.post(
+        '/api/auth/login', json={'email': 'partner@dealflow.com', 'password': 'partner123'}
+    ).json()['access_token']
+    return {'Authorization': f'Bearer {token}'}
+
+
+def approve(client, deal_id, *voters):
+    for headers in voters:
+        assert client.post(f'/api/deals/{deal_id}/vote', json={'vote': 'approve'}, headers=headers).status_code == 200
+
+
+def test_decision_advances_the_deal(client, admin_headers, auto_advance):
+    deal_id = deal_in_ic(client, admin_headers)
+    approve(client, deal_id, admin_headers, auto_advance)
+    assert Deal.objects.get(id=deal_id).stage == 'Invested'
+
+
+def test_decision_does_not_advance_past_a_failing_guard(client, admin_headers, auto_advance, monkeypatch):
+    deal_id = deal_in_ic(client, admin_headers)
+    never = Guard('never', lambda: Value(False), bool, 'Never to {stage}')
+    monkeypatch.setitem(get_workflow().guards, 'Invested', (never,))
+    approve(client, deal_id, admin_headers, auto_advance)
+    assert Deal.objects.get(id=deal_id).stage == 'IC'
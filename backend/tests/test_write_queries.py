@@ -0,0 +1,40 @@
+"""Query budgets for the write endpoints, read from the Server-Timing header"""
+import pytest
+
+from core.instrumentation import assert_max_queries
+
+# (label, method, path, body, budget), run in this order against one deal;
+# {deal} is filled in with the deal create_deal made
+ENDPOINTS = [
+    ('create_deal', 'post', '/api/deals', {'name': 'Budget', 'check_size': '5'}, 1),
+    ('update_deal', 'patch', '/api/deals/{deal}', {'name': 'Budget 2'}, 2),
+    ('update_deal (no-op)', 'patch', '/api/deals/{deal}', {'name': 'Budget 2'}, 1),
+    ('update_deal_stage', 'patch', '/api/deals/{deal}/stage', {'stage': 'Screen'}, 2),
+    ('create_comment', 'post', '/api/deals/{deal}/comments', {'content': 'Looks good'}, 2),
+    # Vote upsert and decision counters in one transaction (its BEGIN is counted)
+    ('cast_vote', 'post', '/api/deals/{deal}/vote', {'vote': 'approve'}, 3),
+    ('cast_vote (change)', 'post', '/api/deals/{deal}/vote', {'vote': 'decline'}, 3),
+    ('create_memo_version', 'post', '/api/deals/{deal}/memos', {'sections': {}}, 2),
+    ('update_deal_stage (Diligence)', 'patch', '/api/deals/{deal}/stage', {'stage': 'Diligence'}, 2),
+    # Guards are checked by the load query; the IC hook marks the memo a milestone,
+    # in one transaction with the move (its BEGIN is counted)
+    ('update_deal_stage (IC)', 'patch', '/api/deals/{deal}/stage', {'stage': 'IC'}, 4),
+]
+
+
+@pytest.fixture(scope='module')
+def deal(client, admin_headers):
+    """Holds the id of the deal the endpoints work on once create_deal has run"""
+    # Fill the token version, revocation and permission caches first
+    client.post('/api/deals', json={'name': 'Warm-up'}, headers=admin_headers)
+    return {}
+
+
+@pytest.mark.parametrize('label, method, path, body, budget', ENDPOINTS, ids=[e[0] for e in ENDPOINTS])
+def test_write_endpoint_query_budget(client, admin_headers, deal, label, method, path, body, budget):
+    if '{deal}' in path and 'id' not in deal:
+        pytest.skip('create_deal failed')
+    response = getattr(client, method)(path.format(deal=deal.get('id')), json=body, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    deal.setdefault('id', response.json()['id'])
+    assert_max_queries(response, budget)
@@ -59,11 +59,24 @@ const ICMemoEditor: React.FC<ICMemoEditorProps> = ({
   const handleSave = async (values: ICMemoSections) => {
     try {
       setSaving(true);
-      const newMemo = await icMemoAPI.createMemoVersion(dealId, { sections: values });
+      const newMemo = await icMemoAPI.createMemoVersion(dealId, {
+        sections: values,
+        base_version: latestVersion ?? 0,
+      });
       message.success(`Saved as version ${newMemo.version}`);
       setLatestVersion(newMemo.version);
       onSaved?.();
     } catch (error: any) {
+      if (error.response?.status === 409) {
+        // Keep the user's edits; saving again builds on the newer version
+        const current = error.response.data.detail.current;
+        setLatestVersion(current?.version ?? null);
+        message.warning(
+          `Version ${current?.version} was saved by ${current?.created_by?.username ?? 'someone else'} ` +
+          'while you were editing. Review it in the history, then save again.'
+        );
+        return;
+      }
       message.error(error.response?.data?.detail || 'Failed to save memo');
       console.error('Error saving memo:', error);
     } finally {
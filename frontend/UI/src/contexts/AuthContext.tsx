@@ -42,6 +42,7 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
         } catch (error) {
           // Token invalid, clear storage
           localStorage.removeItem('token');
+          localStorage.removeItem('refresh_token');
           localStorage.removeItem('user');
         }
       }
@@ -54,10 +55,13 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
   const login = async (credentials: LoginRequest) => {
     try {
       const response = await authAPI.login(credentials);
-      const { access_token, user: userData } = response;
+      const { access_token, refresh_token, user: userData } = response;
 
-      // Store token and user data
+      // Store tokens and user data
       localStorage.setItem('token', access_token);
+      if (refresh_token) {
+        localStorage.setItem('refresh_token', refresh_token);
+      }
       localStorage.setItem('user', JSON.stringify(userData));
       setUser(userData);
     } catch (error) {
@@ -66,7 +70,13 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
   };
 
   const logout = () => {
+    // Best effort: revoke the tokens server-side
+    const token = localStorage.getItem('token');
+    if (token) {
+      authAPI.logout(token, localStorage.getItem('refresh_token')).catch(() => undefined);
+    }
     localStorage.removeItem('token');
+    localStorage.removeItem('refresh_token');
     localStorage.removeItem('user');
     setUser(null);
   };
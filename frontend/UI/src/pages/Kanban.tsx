@@ -4,7 +4,7 @@ import { ArrowLeftOutlined, PlusOutlined, DollarOutlined, LoadingOutlined, FileT
 import { useNavigate } from 'react-router-dom';
 import { useAuth } from '../contexts/AuthContext';
 import { dealsAPI } from '../services/api';
-import type { Deal, DealCreate } from '../types/deals';
+import type { Deal, DealConflict, DealCreate } from '../types/deals';
 import ICMemoEditor from '../components/ICMemoEditor';
 import ICMemoViewer from '../components/ICMemoViewer';
 import ICMemoVersionHistory from '../components/ICMemoVersionHistory';
@@ -178,9 +178,17 @@ const Kanban: React.FC = () => {
       
       try {
         // Call API to update the stage
-        await dealsAPI.updateDealStage(draggedDeal.id, targetStage);
+        const saved = await dealsAPI.updateDealStage(draggedDeal.id, targetStage, draggedDeal.version);
+        setDeals(current => current.map(deal => (deal.id === saved.id ? saved : deal)));
         message.success(`Moved ${draggedDeal.name} from ${oldStage} to ${targetStage}`);
       } catch (error: any) {
+        if (error.response?.status === 409) {
+          // Someone else changed the deal first: show their version instead of re-fetching
+          const conflict: DealConflict = error.response.data.detail;
+          setDeals(deals.map(deal => (deal.id === conflict.current.id ? conflict.current : deal)));
+          message.warning(`${conflict.current.name} was changed by someone else; it is now in ${conflict.current.stage}`);
+          return;
+        }
         // Revert on error
         setDeals(deals);
         message.error(error.response?.data?.detail || 'Failed to update deal stage');
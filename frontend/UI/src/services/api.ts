@@ -25,13 +25,45 @@ api.interceptors.request.use(
   }
 );
 
+// Access tokens are short-lived: on a 401, rotate the refresh token once and
+// retry. Concurrent 401s share a single refresh request.
+let refreshPromise: Promise<string> | null = null;
+
+const refreshAccessToken = async (): Promise<string> => {
+  const refreshToken = localStorage.getItem('refresh_token');
+  if (!refreshToken) {
+    throw new Error('No refresh token');
+  }
+  const response = await axios.post<LoginResponse>('/api/auth/refresh', { refresh_token: refreshToken });
+  localStorage.setItem('token', response.data.access_token);
+  if (response.data.refresh_token) {
+    localStorage.setItem('refresh_token', response.data.refresh_token);
+  }
+  return response.data.access_token;
+};
+
 // Response interceptor to handle errors
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
+    const original = error.config;
+    if (error.response?.status === 401 && original && !original._retried) {
+      original._retried = true;
+      try {
+        refreshPromise = refreshPromise ?? refreshAccessToken();
+        const token = await refreshPromise;
+        original.headers.Authorization = `Bearer ${token}`;
+        return api(original);
+      } catch {
+        // Fall through to logout below
+      } finally {
+        refreshPromise = null;
+      }
+    }
     if (error.response?.status === 401) {
       // Token expired or invalid
       localStorage.removeItem('token');
+      localStorage.removeItem('refresh_token');
       localStorage.removeItem('user');
       window.location.href = '/login';
     }
@@ -46,6 +78,15 @@ export const authAPI = {
     return response.data;
   },
 
+  // Uses plain axios so a 401 here doesn't trigger the refresh/redirect interceptor
+  logout: async (accessToken: string, refreshToken: string | null): Promise<void> => {
+    await axios.post(
+      '/api/auth/logout',
+      { refresh_token: refreshToken },
+      { headers: { Authorization: `Bearer ${accessToken}` } },
+    );
+  },
+
   getCurrentUser: async (): Promise<User> => {
     const response = await api.get<User>('/api/auth/me');
     return response.data;
@@ -64,6 +105,12 @@ export const dealsAPI = {
     return response.data;
   },
 
+  // Several deals in one request, in the order asked for (unknown ids are left out)
+  getDeals: async (dealIds: number[]): Promise<Deal[]> => {
+    const response = await api.get<Deal[]>('/api/deals', { params: { ids: dealIds.join(',') } });
+    return response.data;
+  },
+
   createDeal: async (dealData: DealCreate): Promise<Deal> => {
     const response = await api.post<Deal>('/api/deals', dealData);
     return response.data;
@@ -74,9 +121,11 @@ export const dealsAPI = {
     return response.data;
   },
 
-  updateDealStage: async (dealId: number, stage: string): Promise<Deal> => {
+  // Pass the version the UI last saw to get a 409 (with the current deal) on concurrent moves
+  updateDealStage: async (dealId: number, stage: string, version?: number): Promise<Deal> => {
     const stageData: DealStageUpdate = { stage };
-    const response = await api.patch<Deal>(`/api/deals/${dealId}/stage`, stageData);
+    const headers = version !== undefined ? { 'If-Match': `"${version}"` } : undefined;
+    const response = await api.patch<Deal>(`/api/deals/${dealId}/stage`, stageData, { headers });
     return response.data;
   },
 
@@ -9,6 +9,7 @@ export interface Deal {
   round: string | null;
   check_size: string | null;
   status: string;
+  version: number;
   created_at: string;
   updated_at: string;
 }
@@ -25,10 +26,18 @@ export interface DealUpdate {
   company_url?: string;
   round?: string;
   check_size?: number;
+  version?: number;
 }
 
 export interface DealStageUpdate {
   stage: string;
+  version?: number;
+}
+
+// Body of a 409 returned when a deal was edited concurrently
+export interface DealConflict {
+  message: string;
+  current: Deal;
 }
 
 export interface Activity {
@@ -14,12 +14,15 @@ export interface ICMemo {
   deal_id: number;
   version: number;
   sections: ICMemoSections;
+  is_milestone: boolean;
   created_by: User;
   created_at: string;
 }
 
 export interface ICMemoCreate {
   sections: ICMemoSections;
+  base_version?: number;
+  is_milestone?: boolean;
 }
 
 export const MEMO_SECTION_LABELS: { [key in keyof ICMemoSections]: string } = {